@@ -0,0 +1,5 @@
+"""Backend d'analyse d'échecs"""
+import time
+
+# Début de l'import de l'application, pour mesurer le coût des imports au démarrage
+IMPORT_START = time.perf_counter()
@@ -1,15 +1,25 @@
 """Point d'entrée de l'application FastAPI"""
+import asyncio
 import logging
 import os
+import time
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
 
-from app.routes import analyze, health
+from app import IMPORT_START
+from app.routes import admin, analyze, health, live, puzzles
+from app.services.admission import AdmissionController, OverloadedError
+from app.services.game_cache import GameCache
+from app.services.position_cache import PositionCache, prewarm_position_cache
+from app.services.profiling import PROFILING_SPANS, ServerTimingMiddleware
+from app.services.puzzle_mining import shutdown_process_pool
 from app.services.stockfish_manager import StockfishManager
 
+IMPORT_TIME_MS = round((time.perf_counter() - IMPORT_START) * 1000, 1)
+
 load_dotenv()
 
 # Configuration des logs
@@ -21,12 +31,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 STOCKFISH_PATH = os.getenv("STOCKFISH_PATH", "stockfish")
+POSITION_CACHE_SIZE = int(os.getenv("POSITION_CACHE_SIZE", "10000"))
+GAME_CACHE_MAX_BYTES = int(os.getenv("GAME_CACHE_MAX_MB", "64")) * 1024 * 1024
+# Positions analysées au démarrage, séparées par ";" ("startpos" = position initiale)
+PREWARM_FENS = [fen.strip() for fen in os.getenv("PREWARM_FENS", "").split(";") if fen.strip()]
+# Profondeur par défaut des requêtes : une entrée moins profonde ne serait jamais servie
+PREWARM_DEPTH = int(os.getenv("PREWARM_DEPTH", "13"))
 
 # Initialiser le gestionnaire Stockfish
 manager = StockfishManager(STOCKFISH_PATH)
+admission_controller = AdmissionController.from_env()
+position_cache = PositionCache(POSITION_CACHE_SIZE)
+game_cache = GameCache(GAME_CACHE_MAX_BYTES)
 
 # Créer l'application FastAPI
 app = FastAPI(title="Chess Analyzer", version="1.0.0")
+app.state.import_time_ms = IMPORT_TIME_MS
+app.state.prewarmed_positions = 0
 
 # Configuration CORS pour permettre les requêtes depuis l'app mobile
 # En beta, autoriser toutes les origines. En production, spécifier via CORS_ORIGINS
@@ -44,6 +65,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing sur demande (en-tête X-Profile-Spans: 1) ; absent par défaut
+if PROFILING_SPANS:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Configurer la dépendance pour les routes d'analyse
 def get_engine_manager() -> StockfishManager:
     """Dependency pour obtenir le gestionnaire Stockfish"""
@@ -51,24 +76,47 @@ def get_engine_manager() -> StockfishManager:
 
 
 analyze.set_engine_manager_dependency(get_engine_manager)
+analyze.set_admission_controller_dependency(lambda: admission_controller)
+analyze.set_position_cache_dependency(lambda: position_cache)
+analyze.set_game_cache_dependency(lambda: game_cache)
 
 # Inclure les routes
 app.include_router(health.router)
 app.include_router(analyze.router)
+app.include_router(puzzles.router)
+app.include_router(live.router)
+app.include_router(admin.router)
+
+
+async def _start_engine() -> None:
+    """Lance Stockfish puis préchauffe le cache de positions (en arrière-plan)"""
+    try:
+        await manager.start()
+    except RuntimeError:
+        return  # Erreur exposée par /ready
+    if PREWARM_FENS:
+        app.state.prewarmed_positions = await prewarm_position_cache(
+            position_cache, manager, PREWARM_FENS, PREWARM_DEPTH
+        )
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    """Démarre l'application et initialise Stockfish"""
-    logger.info("[FastAPI] Démarrage de l'application...")
-    await manager.start()
-    logger.info("[FastAPI] Application démarrée, prête à recevoir des requêtes")
+    """Démarre l'application ; Stockfish est lancé sans bloquer l'écoute HTTP"""
+    logger.info(f"[FastAPI] Démarrage de l'application (imports: {IMPORT_TIME_MS}ms)...")
+    app.state.engine_task = asyncio.create_task(_start_engine())
+    logger.info("[FastAPI] Application démarrée, Stockfish en cours de lancement (voir /ready)")
 
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     """Arrête l'application et ferme Stockfish"""
+    task = app.state.engine_task
+    if not task.done():
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
     await manager.stop()
+    shutdown_process_pool()
 
 
 @app.exception_handler(RuntimeError)
@@ -78,3 +126,15 @@ async def runtime_error_handler(
     """Gestionnaire d'erreurs pour les RuntimeError"""
     logger.error(f"[FastAPI] RuntimeError: {exc}")
     return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+
+@app.exception_handler(OverloadedError)
+async def overloaded_error_handler(
+    request: Request, exc: OverloadedError
+) -> JSONResponse:  # type: ignore[override]
+    """Refus rapide du contrôle d'admission (429 ou 503 avec Retry-After)"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
@@ -3,6 +3,15 @@ from typing import Optional
 
 from pydantic import BaseModel, Field
 
+# Tables de codes pour l'encodage compact (l'ordre fait partie du format : ne
+# jamais réordonner, seulement ajouter en fin de tuple)
+MOVE_QUALITIES = ("best", "excellent", "good", "inaccuracy", "mistake", "blunder", "miss")
+GAME_PHASES = ("opening", "middlegame", "endgame")
+EVALUATION_TYPES = ("cp", "mate")
+
+# Nombre maximal de parties par requête /mine-puzzles
+MINE_PUZZLES_MAX_GAMES = 20
+
 
 class AnalyzeRequest(BaseModel):
     fen: str
@@ -36,6 +45,16 @@ class GameAnalysisResponse(BaseModel):
     evaluation_loss: float  # En centipawns
     evaluation_type: str  # "cp" ou "mate"
     mate_in: Optional[int]  # Nombre de coups jusqu'au mat (si evaluation_type == "mate")
+    # Évaluations avant le coup et après le meilleur coup (cette dernière absente si
+    # le meilleur coup a été joué) : permettent de reclassifier le coup plus tard
+    # sans relancer Stockfish
+    evaluation_before: Optional[float] = None  # En pawns
+    evaluation_best_after: Optional[float] = None  # En pawns
+    evaluation_type_best_after: Optional[str] = None
+    mate_in_best_after: Optional[int] = None
+    # Camp qui a joué le coup : move_number ne suffit pas pour une partie commencée
+    # depuis une FEN avec les noirs au trait
+    is_white: Optional[bool] = None
 
 
 class AnalyzeGameResponse(BaseModel):
@@ -43,6 +62,111 @@ class AnalyzeGameResponse(BaseModel):
     analyses: list[GameAnalysisResponse]
 
 
+class CompactGameAnalysisResponse(BaseModel):
+    """Réponse de /analyze-game en encodage compact (une liste par colonne, sans FEN)"""
+    format: str  # "compact"
+    version: int
+    # Tables de codes : move_quality, game_phase et evaluation_type* sont des index
+    move_qualities: list[str]
+    game_phases: list[str]
+    evaluation_types: list[str]
+    move_number: list[int]
+    evaluation: list[float]
+    best_move: list[Optional[str]]
+    played_move: list[str]
+    move_quality: list[int]
+    game_phase: list[int]
+    evaluation_loss: list[float]
+    evaluation_type: list[int]
+    mate_in: list[Optional[int]]
+    evaluation_before: list[Optional[float]]
+    evaluation_best_after: list[Optional[float]]
+    evaluation_type_best_after: list[Optional[int]]
+    mate_in_best_after: list[Optional[int]]
+    is_white: list[Optional[bool]]
+
+
+class StoredMoveEvaluation(BaseModel):
+    """Évaluations déjà calculées d'un coup (telles que renvoyées par /analyze-game)"""
+    move_number: int
+    played_move: str  # UCI
+    best_move: Optional[str]  # UCI
+    evaluation: float  # En pawns, après le coup joué
+    evaluation_type: str  # "cp" ou "mate"
+    mate_in: Optional[int] = None
+    # Absente (anciennes analyses) : évaluation du coup précédent s'il est fourni,
+    # sinon le coup n'est pas reclassifié
+    evaluation_before: Optional[float] = None  # En pawns
+    evaluation_best_after: Optional[float] = None  # En pawns
+    evaluation_type_best_after: Optional[str] = None
+    mate_in_best_after: Optional[int] = None
+    # Camp qui a joué le coup. Par défaut : déduit du trait de `fen` (position avant
+    # le coup) si elle est fournie, sinon de move_number (coups impairs = blancs)
+    is_white: Optional[bool] = None
+    fen: Optional[str] = None
+
+
+class ReclassifyGame(BaseModel):
+    game_id: Optional[str] = None
+    analyses: list[StoredMoveEvaluation]
+
+
+class ReclassifyRequest(BaseModel):
+    games: list[ReclassifyGame]
+
+
+class ReclassifiedMove(BaseModel):
+    move_number: int
+    move_quality: str
+    game_phase: str
+    evaluation_loss: float  # En centipawns
+
+
+class ReclassifiedGame(BaseModel):
+    """Une ligne du flux NDJSON renvoyé par /reclassify"""
+    game_id: Optional[str]
+    classification_version: int
+    analyses: list[ReclassifiedMove]
+    # Coups ignorés faute de pouvoir connaître l'évaluation avant le coup
+    skipped: list[int] = []
+
+
+class PuzzleGame(BaseModel):
+    game_id: Optional[str] = None
+    pgn: str
+    # Analyses déjà calculées (/analyze-game) ; sinon la partie est analysée
+    analyses: Optional[list[GameAnalysisResponse]] = None
+
+
+class MinePuzzlesRequest(BaseModel):
+    games: list[PuzzleGame] = Field(min_length=1, max_length=MINE_PUZZLES_MAX_GAMES)
+    depth: int = Field(default=13, ge=1, le=25)
+
+
+class PuzzleResponse(BaseModel):
+    """Exercice extrait d'une erreur de la partie"""
+    move_number: int
+    fen: str  # Position de départ (avant le coup raté)
+    source_quality: str  # "blunder" ou "miss"
+    played_move: str  # UCI - coup joué dans la partie
+    solution: list[str]  # UCI - coups alternés joueur/adversaire, finit par un coup du joueur
+    solution_san: list[str]
+    evaluation: float  # En pawns, du point de vue du joueur au trait
+    evaluation_type: str  # "cp" ou "mate"
+    mate_in: Optional[int]
+
+
+class GamePuzzlesResponse(BaseModel):
+    game_id: Optional[str]
+    puzzles: list[PuzzleResponse]
+    candidates: int  # Coups "blunder"/"miss" examinés
+    engine_searches: int  # Coût moteur de l'extraction (hors analyse de la partie)
+
+
+class MinePuzzlesResponse(BaseModel):
+    games: list[GamePuzzlesResponse]
+
+
 class ClassifyMoveRequest(BaseModel):
     fen: str
     move_uci: str  # Coup joué en UCI
@@ -61,5 +185,20 @@ class ClassifyMoveResponse(BaseModel):
     mate_in_after: Optional[int]  # Nombre de coups jusqu'au mat (si evaluation_type_after == "mate")
 
 
+class LivePositionMessage(BaseModel):
+    """Message client du WebSocket /ws/analyze"""
+    type: str  # "position" ou "stop"
+    fen: Optional[str] = None
+    depth: int = Field(default=20, ge=1, le=25)
+
+
 class HealthResponse(BaseModel):
     status: str
+
+
+class ReadyResponse(BaseModel):
+    status: str  # "ready", "starting" ou "error"
+    detail: Optional[str] = None
+    import_time_ms: Optional[float] = None  # Imports Python de l'application
+    engine_start_ms: Optional[float] = None  # Lancement de Stockfish
+    prewarmed_positions: int = 0
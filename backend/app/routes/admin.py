@@ -0,0 +1,54 @@
+"""Routes d'administration (profilage)"""
+import asyncio
+import logging
+import os
+import secrets
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from starlette.responses import PlainTextResponse
+
+from app.services.profiling import collapsed, sample_stacks
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Sans jeton configuré, les routes d'administration sont désactivées (404)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = 60.0
+
+_profile_lock = asyncio.Lock()
+
+
+def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None) -> None:
+    """Vérifie l'en-tête X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def capture_profile(
+    seconds: Annotated[float, Query(gt=0, le=PROFILE_MAX_SECONDS)] = 10.0,
+) -> PlainTextResponse:
+    """
+    Profil par échantillonnage de tous les threads pendant `seconds`
+
+    Réponse au format « collapsed » (une pile et son nombre d'occurrences par
+    ligne), lisible par flamegraph.pl ou speedscope. Une capture à la fois.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+
+    async with _profile_lock:
+        logger.info(f"[Admin] Capture d'un profil pendant {seconds}s")
+        loop = asyncio.get_running_loop()
+        stacks, samples = await loop.run_in_executor(None, sample_stacks, seconds)
+
+    return PlainTextResponse(collapsed(stacks), headers={"X-Profile-Samples": str(samples)})
@@ -1,9 +1,15 @@
 """Routes pour l'analyse de positions"""
 import logging
-from typing import Annotated, Callable
+from typing import Annotated, Any, Callable
 
 import chess
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
+from starlette.requests import HTTPConnection
+from starlette.responses import StreamingResponse
 
 from app.models import (
     AnalyzeRequest,
@@ -12,20 +18,42 @@ from app.models import (
     AnalyzeGameResponse,
     ClassifyMoveRequest,
     ClassifyMoveResponse,
+    CompactGameAnalysisResponse,
+    ReclassifyGame,
+    ReclassifyRequest,
 )
+from app.services.admission import AdmissionController, OverloadedError
 from app.services.analysis import analyze_position, handle_terminal_position
 from app.services.game_analysis import (
-    analyze_game,
+    analyze_parsed_game,
     classify_move_in_position,
 )
+from app.services.game_cache import CanonicalGame, GameCache
+from app.services.position_cache import PositionCache
+from app.services.profiling import span
+from app.services.reclassification import read_ndjson_games, reclassify_game, reclassify_games
+from app.services.serialization import COMPACT_MEDIA_TYPE, game_analysis_response
 from app.services.stockfish_manager import StockfishManager
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["analysis"])
 
-# La fonction de dépendance sera fournie depuis main.py
+# En-tête indiquant la profondeur réellement servie quand elle a été réduite
+DEGRADED_DEPTH_HEADER = "X-Analysis-Degraded-Depth"
+# En-tête indiquant si l'analyse de partie vient du cache ("hit"), d'une analyse
+# identique en cours ("coalesced") ou du moteur ("miss")
+GAME_CACHE_HEADER = "X-Game-Cache"
+# Entrée et sortie de /reclassify (un objet JSON par ligne)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Attente maximale (s) du démarrage de Stockfish avant de répondre 503
+ENGINE_READY_WAIT = 2.0
+
+# Les fonctions de dépendance seront fournies depuis main.py
 _engine_manager_dep: Callable[[], StockfishManager] | None = None
+_admission_controller_dep: Callable[[], AdmissionController] | None = None
+_position_cache_dep: Callable[[], PositionCache] | None = None
+_game_cache_dep: Callable[[], GameCache] | None = None
 
 
 def set_engine_manager_dependency(dep: Callable[[], StockfishManager]) -> None:
@@ -41,10 +69,80 @@ def get_engine_manager() -> StockfishManager:
     return _engine_manager_dep()
 
 
+async def ensure_engine_ready(engine_manager: StockfishManager) -> None:
+    """Attend le démarrage de Stockfish (503 + Retry-After s'il n'est pas prêt à temps)"""
+    try:
+        await engine_manager.wait_ready(timeout=ENGINE_READY_WAIT)
+    except RuntimeError as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": "1"}
+        ) from exc
+
+
+async def get_ready_engine_manager(
+    engine_manager: Annotated[StockfishManager, Depends(get_engine_manager)],
+) -> StockfishManager:
+    """Gestionnaire Stockfish une fois démarré"""
+    await ensure_engine_ready(engine_manager)
+    return engine_manager
+
+
+def set_admission_controller_dependency(dep: Callable[[], AdmissionController]) -> None:
+    """Configure la dépendance pour le contrôle d'admission"""
+    global _admission_controller_dep
+    _admission_controller_dep = dep
+
+
+def get_admission_controller() -> AdmissionController:
+    """Dependency pour obtenir le contrôle d'admission"""
+    if _admission_controller_dep is None:
+        raise RuntimeError("Admission controller dependency not set")
+    return _admission_controller_dep()
+
+
+def set_position_cache_dependency(dep: Callable[[], PositionCache]) -> None:
+    """Configure la dépendance pour le cache de positions"""
+    global _position_cache_dep
+    _position_cache_dep = dep
+
+
+def get_position_cache() -> PositionCache:
+    """Dependency pour obtenir le cache de positions"""
+    if _position_cache_dep is None:
+        raise RuntimeError("Position cache dependency not set")
+    return _position_cache_dep()
+
+
+def set_game_cache_dependency(dep: Callable[[], GameCache]) -> None:
+    """Configure la dépendance pour le cache de parties"""
+    global _game_cache_dep
+    _game_cache_dep = dep
+
+
+def get_game_cache() -> GameCache:
+    """Dependency pour obtenir le cache de parties"""
+    if _game_cache_dep is None:
+        raise RuntimeError("Game cache dependency not set")
+    return _game_cache_dep()
+
+
+def get_client_id(request: HTTPConnection) -> str:
+    """Identifiant du client pour le partage équitable (X-Client-Id, sinon IP)"""
+    return (
+        request.headers.get("x-client-id")
+        or request.headers.get("fly-client-ip")
+        or (request.client.host if request.client else "unknown")
+    )
+
+
 @router.post("/analyze-position", response_model=AnalyzeResponse)
 async def analyze_position_endpoint(
     payload: AnalyzeRequest,
-    engine_manager: Annotated[StockfishManager, Depends(get_engine_manager)],
+    response: Response,
+    engine_manager: Annotated[StockfishManager, Depends(get_ready_engine_manager)],
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    position_cache: Annotated[PositionCache, Depends(get_position_cache)],
+    client_id: Annotated[str, Depends(get_client_id)],
 ) -> AnalyzeResponse:
     """
     Analyse une position d'échecs avec Stockfish
@@ -66,51 +164,146 @@ async def analyze_position_endpoint(
     if board.is_game_over():
         return handle_terminal_position(board)
 
-    # Analyser avec Stockfish
+    fen = board.fen()
+    cached = position_cache.get(fen, payload.depth)
+    if cached is not None:
+        return cached
+
     try:
-        async with engine_manager.acquire() as engine:
-            return await analyze_position(board, engine, payload.depth)
-    except RuntimeError as exc:
-        logger.error(f"[Analyze] Erreur runtime: {exc}")
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    except Exception as exc:
-        logger.error(f"[Analyze] Erreur inattendue: {exc}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
+        async with admission.admit("analyze-position", client_id) as ticket:
+            depth = ticket.depth(payload.depth)
+            if ticket.degraded:
+                # Sous pression : un résultat en cache moins profond vaut mieux qu'une recherche
+                cached = position_cache.get(fen, depth)
+                if cached is not None:
+                    if cached.depth < payload.depth:
+                        response.headers[DEGRADED_DEPTH_HEADER] = str(cached.depth)
+                    return cached
+                if depth < payload.depth:
+                    response.headers[DEGRADED_DEPTH_HEADER] = str(depth)
+
+            # Analyser avec Stockfish
+            try:
+                async with engine_manager.acquire() as engine:
+                    result = await analyze_position(board, engine, depth)
+            except RuntimeError as exc:
+                logger.error(f"[Analyze] Erreur runtime: {exc}")
+                raise HTTPException(status_code=500, detail=str(exc)) from exc
+            except Exception as exc:
+                logger.error(f"[Analyze] Erreur inattendue: {exc}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
+    except OverloadedError:
+        # Refusé : servir un résultat en cache suffisamment profond s'il existe
+        cached = position_cache.get(fen, admission.degraded_depth)
+        if cached is None:
+            raise
+        if cached.depth < payload.depth:
+            response.headers[DEGRADED_DEPTH_HEADER] = str(cached.depth)
+        return cached
 
+    position_cache.put(fen, result)
+    return result
 
-@router.post("/analyze-game", response_model=AnalyzeGameResponse)
+
+@router.post(
+    "/analyze-game",
+    response_model=AnalyzeGameResponse,
+    response_class=ORJSONResponse,
+    responses={
+        200: {
+            "description": "JSON standard, ou encodage compact si demandé",
+            "content": {
+                COMPACT_MEDIA_TYPE: {"schema": CompactGameAnalysisResponse.model_json_schema()}
+            },
+        }
+    },
+)
 async def analyze_game_endpoint(
     payload: AnalyzeGameRequest,
+    request: Request,
     engine_manager: Annotated[StockfishManager, Depends(get_engine_manager)],
-) -> AnalyzeGameResponse:
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    game_cache: Annotated[GameCache, Depends(get_game_cache)],
+    client_id: Annotated[str, Depends(get_client_id)],
+) -> Response:
     """
     Analyse complète d'une partie d'échecs
     
-    Retourne toutes les analyses prêtes à être insérées dans la DB
+    Retourne toutes les analyses prêtes à être insérées dans la DB.
+    Encodage compact (`?format=compact`) et compression gzip/brotli négociés.
+    Une partie déjà analysée à cette profondeur est servie depuis le cache.
     """
     logger.info(
         f"[Analyze] Requête analyse partie reçue - depth: {payload.depth}, PGN length: {len(payload.pgn)}"
     )
 
     try:
-        async with engine_manager.acquire() as engine:
-            analyses = await analyze_game(payload.pgn, engine, payload.depth)
-            return AnalyzeGameResponse(analyses=analyses)
+        with span("cache_key"):
+            canonical = CanonicalGame(payload.pgn)
+            cache_key = canonical.key(payload.depth)
     except ValueError as exc:
         logger.error(f"[Analyze] Erreur validation: {exc}")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except RuntimeError as exc:
-        logger.error(f"[Analyze] Erreur runtime: {exc}")
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    except Exception as exc:
-        logger.error(f"[Analyze] Erreur inattendue: {exc}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
+
+    # Un résultat en cache ne passe ni par l'admission ni par le moteur
+    cached = game_cache.get(cache_key)
+    if cached is not None:
+        logger.info("[Analyze] Partie servie depuis le cache")
+        with span("serialize"):
+            response = game_analysis_response(request, cached)
+        response.headers[GAME_CACHE_HEADER] = "hit"
+        return response
+
+    # La même partie est déjà en cours d'analyse : attendre son résultat
+    shared = await game_cache.wait_inflight(cache_key)
+    if shared is not None:
+        analyses, depth = shared
+        logger.info("[Analyze] Partie servie par une analyse identique en cours")
+        with span("serialize"):
+            response = game_analysis_response(request, analyses)
+        response.headers[GAME_CACHE_HEADER] = "coalesced"
+        if depth < payload.depth:
+            response.headers[DEGRADED_DEPTH_HEADER] = str(depth)
+        return response
+
+    with game_cache.lead(cache_key) as flight:
+        await ensure_engine_ready(engine_manager)
+        async with admission.admit("analyze-game", client_id) as ticket:
+            depth = ticket.depth(payload.depth)
+            try:
+                async with engine_manager.acquire() as engine:
+                    analyses = await analyze_parsed_game(canonical.game, engine, depth)
+                with span("serialize"):
+                    response = game_analysis_response(request, analyses)
+            except ValueError as exc:
+                logger.error(f"[Analyze] Erreur validation: {exc}")
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            except RuntimeError as exc:
+                logger.error(f"[Analyze] Erreur runtime: {exc}")
+                raise HTTPException(status_code=500, detail=str(exc)) from exc
+            except Exception as exc:
+                logger.error(f"[Analyze] Erreur inattendue: {exc}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
+
+        # Les coups en erreur sont omis par analyze_parsed_game : seule une analyse
+        # complète est mise en cache, sous la profondeur réellement utilisée
+        if canonical.plies and len(analyses) == canonical.plies:
+            game_cache.put(canonical.key(depth), analyses)
+        flight.set_result((analyses, depth))
+
+    response.headers[GAME_CACHE_HEADER] = "miss"
+    if depth < payload.depth:
+        response.headers[DEGRADED_DEPTH_HEADER] = str(depth)
+    return response
 
 
 @router.post("/classify-move", response_model=ClassifyMoveResponse)
 async def classify_move_endpoint(
     payload: ClassifyMoveRequest,
-    engine_manager: Annotated[StockfishManager, Depends(get_engine_manager)],
+    response: Response,
+    engine_manager: Annotated[StockfishManager, Depends(get_ready_engine_manager)],
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    client_id: Annotated[str, Depends(get_client_id)],
 ) -> ClassifyMoveResponse:
     """
     Classifie un coup joué dans une position
@@ -129,39 +322,115 @@ async def classify_move_endpoint(
         raise HTTPException(status_code=400, detail=f"Invalid FEN: {exc}") from exc
 
     try:
-        async with engine_manager.acquire() as engine:
-            try:
-                move_obj = chess.Move.from_uci(payload.move_uci)
-            except ValueError as exc:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid move UCI: {exc}",
-                ) from exc
-
-            if move_obj not in board.legal_moves:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid move: {payload.move_uci}",
+        move_obj = chess.Move.from_uci(payload.move_uci)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid move UCI: {exc}",
+        ) from exc
+
+    if move_obj not in board.legal_moves:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid move: {payload.move_uci}",
+        )
+
+    async with admission.admit("classify-move", client_id) as ticket:
+        depth = ticket.depth(payload.depth)
+        if depth < payload.depth:
+            response.headers[DEGRADED_DEPTH_HEADER] = str(depth)
+        try:
+            async with engine_manager.acquire() as engine:
+                result = await classify_move_in_position(
+                    board, payload.move_uci, engine, depth
                 )
+        except RuntimeError as exc:
+            logger.error(f"[Analyze] Erreur runtime: {exc}")
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+        except Exception as exc:
+            logger.error(f"[Analyze] Erreur inattendue: {exc}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
 
-            result = await classify_move_in_position(
-                board, payload.move_uci, engine, payload.depth
-            )
-
-            return ClassifyMoveResponse(
-                move_quality=result.move_quality,
-                evaluation_loss=result.evaluation_loss,
-                best_move=result.best_move,
-                opponent_best_move=result.opponent_best_move,
-                evaluation_before=result.evaluation_before / 100.0,
-                evaluation_after=result.evaluation_after / 100.0,
-                evaluation_type_after=result.evaluation_type_after,
-                mate_in_after=result.mate_in_after,
-            )
-    except RuntimeError as exc:
-        logger.error(f"[Analyze] Erreur runtime: {exc}")
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    except Exception as exc:
-        logger.error(f"[Analyze] Erreur inattendue: {exc}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
+    return ClassifyMoveResponse(
+        move_quality=result.move_quality,
+        evaluation_loss=result.evaluation_loss,
+        best_move=result.best_move,
+        opponent_best_move=result.opponent_best_move,
+        evaluation_before=result.evaluation_before / 100.0,
+        evaluation_after=result.evaluation_after / 100.0,
+        evaluation_type_after=result.evaluation_type_after,
+        mate_in_after=result.mate_in_after,
+    )
+
+
+def _inline_schema(model: type[BaseModel]) -> dict[str, Any]:
+    """Schéma JSON sans `$defs` (les références locales ne se résolvent pas dans OpenAPI)"""
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def _resolve(node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref", "")
+            if ref.startswith("#/$defs/"):
+                return _resolve(definitions[ref.removeprefix("#/$defs/")])
+            return {key: _resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [_resolve(value) for value in node]
+        return node
+
+    return _resolve(schema)
+
+
+@router.post(
+    "/reclassify",
+    response_class=StreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": _inline_schema(ReclassifyRequest)},
+                NDJSON_MEDIA_TYPE: {"schema": _inline_schema(ReclassifyGame)},
+            },
+        }
+    },
+)
+async def reclassify_endpoint(request: Request) -> StreamingResponse:
+    """
+    Reclassifie des analyses déjà calculées, sans relancer Stockfish
+
+    Corps `application/x-ndjson` (une `ReclassifyGame` par ligne) : lu et traité
+    au fil de l'eau, sans garder le lot en mémoire. Une ligne invalide arrête le
+    flux sur une ligne `{"error": ..., "line": ...}`. Un corps JSON
+    `ReclassifyRequest` reste accepté (lu en entier).
+
+    Réponse en NDJSON : une ligne `ReclassifiedGame` par partie, dans l'ordre reçu.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type != NDJSON_MEDIA_TYPE:
+        try:
+            payload = ReclassifyRequest.model_validate_json(await request.body())
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors()) from exc
+        logger.info(f"[Analyze] Requête reclassification - {len(payload.games)} parties")
+
+        def _lines():
+            for game in reclassify_games(payload.games):
+                yield orjson.dumps(game) + b"\n"
+
+        return StreamingResponse(_lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    logger.info("[Analyze] Requête reclassification NDJSON")
+
+    async def _ndjson_lines():
+        line = 0
+        try:
+            async for game in read_ndjson_games(request.stream()):
+                line += 1
+                yield orjson.dumps(reclassify_game(game)) + b"\n"
+        except ValueError as exc:
+            logger.error(f"[Analyze] Ligne NDJSON {line + 1} invalide: {exc}")
+            yield orjson.dumps({"error": str(exc), "line": line + 1}) + b"\n"
+            return
+        logger.info(f"[Analyze] Reclassification NDJSON terminée - {line} parties")
 
+    return StreamingResponse(_ndjson_lines(), media_type=NDJSON_MEDIA_TYPE)
@@ -1,7 +1,19 @@
 """Routes de santé"""
-from fastapi import APIRouter
+from typing import Annotated, Any
 
-from app.models import HealthResponse
+from fastapi import APIRouter, Depends, Request, Response
+
+from app.models import HealthResponse, ReadyResponse
+from app.routes.analyze import (
+    get_admission_controller,
+    get_engine_manager,
+    get_game_cache,
+    get_position_cache,
+)
+from app.services.admission import AdmissionController
+from app.services.game_cache import GameCache
+from app.services.position_cache import PositionCache
+from app.services.stockfish_manager import StockfishManager
 
 router = APIRouter(tags=["health"])
 
@@ -11,3 +23,53 @@ async def health() -> HealthResponse:
     """Endpoint de santé pour vérifier que l'API est opérationnelle"""
     return HealthResponse(status="ok")
 
+
+@router.get(
+    "/ready",
+    response_model=ReadyResponse,
+    responses={503: {"model": ReadyResponse, "description": "Stockfish pas encore prêt"}},
+)
+async def ready(
+    request: Request,
+    response: Response,
+    engine_manager: Annotated[StockfishManager, Depends(get_engine_manager)],
+) -> ReadyResponse:
+    """
+    Prêt à analyser : Stockfish démarré (contrairement à /health, qui répond dès
+    que le serveur écoute)
+    """
+    if engine_manager.is_ready:
+        status = "ready"
+    else:
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        status = "error" if engine_manager.start_error else "starting"
+    return ReadyResponse(
+        status=status,
+        detail=engine_manager.start_error,
+        import_time_ms=getattr(request.app.state, "import_time_ms", None),
+        engine_start_ms=engine_manager.start_duration_ms,
+        prewarmed_positions=getattr(request.app.state, "prewarmed_positions", 0),
+    )
+
+
+@router.get("/metrics")
+async def metrics(
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    position_cache: Annotated[PositionCache, Depends(get_position_cache)],
+    game_cache: Annotated[GameCache, Depends(get_game_cache)],
+) -> dict[str, Any]:
+    """Charge et refus du contrôle d'admission, état des caches"""
+    return {
+        "admission": {
+            "endpoints": admission.stats(),
+            "estimated_wait_s": round(admission.estimated_wait(), 3),
+            "rejected": admission.rejected,
+        },
+        "position_cache": {
+            "entries": len(position_cache),
+            "hits": position_cache.hits,
+            "misses": position_cache.misses,
+        },
+        "game_cache": game_cache.stats(),
+    }
@@ -0,0 +1,68 @@
+"""Route WebSocket pour l'analyse en direct"""
+import logging
+from typing import Annotated, Any
+
+import chess
+import orjson
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.models import LivePositionMessage
+from app.routes.analyze import get_admission_controller, get_client_id, get_engine_manager
+from app.services.admission import AdmissionController
+from app.services.live_analysis import LiveAnalysisSession
+from app.services.stockfish_manager import StockfishManager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["analysis"])
+
+
+@router.websocket("/ws/analyze")
+async def live_analysis_endpoint(
+    websocket: WebSocket,
+    engine_manager: Annotated[StockfishManager, Depends(get_engine_manager)],
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    client_id: Annotated[str, Depends(get_client_id)],
+) -> None:
+    """
+    Analyse en direct d'une position
+
+    Client -> serveur : `{"type": "position", "fen": "...", "depth": 20}` ou `{"type": "stop"}`.
+    Serveur -> client : trames `info` (depth, score, pv) au fil de la recherche,
+    puis `done`. Chaque trame porte l'`id` de la position envoyée (trame `started`).
+    """
+    await websocket.accept()
+
+    async def _send(frame: dict[str, Any]) -> None:
+        await websocket.send_text(orjson.dumps(frame).decode())
+
+    session = LiveAnalysisSession(engine_manager, admission, client_id, _send)
+    logger.info("[LiveAnalysis] Session ouverte")
+
+    try:
+        while True:
+            try:
+                message = LivePositionMessage.model_validate(await websocket.receive_json())
+            except (ValidationError, ValueError) as exc:
+                await _send({"type": "error", "detail": f"Invalid message: {exc}"})
+                continue
+
+            if message.type == "stop":
+                await session.stop()
+                continue
+            if message.type != "position" or message.fen is None:
+                await _send({"type": "error", "detail": "Expected a 'position' message with a fen"})
+                continue
+
+            try:
+                board = chess.Board(message.fen)
+            except ValueError as exc:
+                await _send({"type": "error", "detail": f"Invalid FEN: {exc}"})
+                continue
+
+            await session.set_position(board, message.depth)
+    except WebSocketDisconnect:
+        logger.info("[LiveAnalysis] Session fermée par le client")
+    finally:
+        await session.stop()
@@ -0,0 +1,99 @@
+"""Routes pour l'extraction d'exercices"""
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from app.models import GamePuzzlesResponse, MinePuzzlesRequest, MinePuzzlesResponse
+from app.routes.analyze import (
+    DEGRADED_DEPTH_HEADER,
+    get_admission_controller,
+    get_client_id,
+    get_game_cache,
+    get_ready_engine_manager,
+)
+from app.services.admission import AdmissionController
+from app.services.game_cache import CanonicalGame, GameCache
+from app.services.game_analysis import analyze_parsed_game
+from app.services.puzzle_mining import mine_puzzles
+from app.services.stockfish_manager import StockfishManager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["puzzles"])
+
+
+@router.post("/mine-puzzles", response_model=MinePuzzlesResponse)
+async def mine_puzzles_endpoint(
+    payload: MinePuzzlesRequest,
+    response: Response,
+    engine_manager: Annotated[StockfishManager, Depends(get_ready_engine_manager)],
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    game_cache: Annotated[GameCache, Depends(get_game_cache)],
+    client_id: Annotated[str, Depends(get_client_id)],
+) -> MinePuzzlesResponse:
+    """
+    Extrait des exercices des coups "blunder" et "miss" de chaque partie
+
+    Chaque solution est vérifiée unique par une recherche MultiPV. Les parties
+    envoyées sans analyses sont d'abord analysées.
+    """
+    logger.info(
+        f"[Puzzles] Requête extraction - {len(payload.games)} parties, depth: {payload.depth}"
+    )
+
+    results: list[GamePuzzlesResponse] = []
+    served_depth = payload.depth
+    for game in payload.games:
+        # Une admission par partie : la place est rendue entre deux parties et la
+        # durée moyenne estimée reste celle d'une partie
+        async with admission.admit("mine-puzzles", client_id) as ticket:
+            depth = ticket.depth(payload.depth)
+            try:
+                if game.analyses is None:
+                    canonical = CanonicalGame(game.pgn)
+                    cache_key = canonical.key(depth)
+                    analyses = game_cache.get(cache_key)
+                    if analyses is None:
+                        shared = await game_cache.wait_inflight(cache_key)
+                        if shared is not None:
+                            analyses, depth = shared
+                    if analyses is None:
+                        with game_cache.lead(cache_key) as flight:
+                            async with engine_manager.acquire() as engine:
+                                analyses = await analyze_parsed_game(canonical.game, engine, depth)
+                            if canonical.plies and len(analyses) == canonical.plies:
+                                game_cache.put(cache_key, analyses)
+                            flight.set_result((analyses, depth))
+                else:
+                    analyses = game.analyses
+                served_depth = min(served_depth, depth)
+
+                puzzles, candidates, engine_searches = await mine_puzzles(
+                    game.pgn,
+                    [analysis.model_dump() for analysis in analyses],
+                    engine_manager,
+                    depth,
+                )
+            except ValueError as exc:
+                logger.error(f"[Puzzles] Erreur validation: {exc}")
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            except RuntimeError as exc:
+                logger.error(f"[Puzzles] Erreur runtime: {exc}")
+                raise HTTPException(status_code=500, detail=str(exc)) from exc
+            except Exception as exc:
+                logger.error(f"[Puzzles] Erreur inattendue: {exc}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"Unexpected error: {exc}") from exc
+
+        results.append(
+            GamePuzzlesResponse(
+                game_id=game.game_id,
+                puzzles=puzzles,
+                candidates=candidates,
+                engine_searches=engine_searches,
+            )
+        )
+
+    if served_depth < payload.depth:
+        response.headers[DEGRADED_DEPTH_HEADER] = str(served_depth)
+    return MinePuzzlesResponse(games=results)
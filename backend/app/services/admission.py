@@ -0,0 +1,229 @@
+"""Contrôle d'admission devant le moteur Stockfish
+
+Sans limite, les requêtes s'empilent sur le verrou du moteur jusqu'au timeout
+de tous les clients. Ici chaque endpoint a un nombre de requêtes en cours et une
+file d'attente bornés, et une part équitable par client (429 au-delà).
+
+Tous les endpoints partagent un seul moteur : l'attente estimée d'une nouvelle
+requête est le temps moteur de tout le travail déjà admis, tous endpoints
+confondus. Au-delà d'ADMISSION_MAX_WAIT_S, la requête est refusée immédiatement
+(503 + Retry-After) ; avant cela, dès ADMISSION_DEGRADE_PRESSURE, la profondeur
+demandée est réduite.
+"""
+import asyncio
+import logging
+import math
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.services.stockfish_manager import track_engine_time
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (requêtes en cours, file d'attente, temps moteur initial estimé en s)
+DEFAULT_LIMITS = {
+    "analyze-position": (4, 16, 0.5),
+    "classify-move": (2, 8, 1.5),
+    "analyze-game": (1, 4, 15.0),
+    "mine-puzzles": (1, 4, 10.0),
+    "live-analysis": (2, 8, 5.0),
+}
+# Part maximale des places d'un endpoint qu'un même client peut occuper
+CLIENT_MAX_SHARE = float(os.getenv("ADMISSION_CLIENT_SHARE", "0.5"))
+# Poids des nouvelles mesures dans la moyenne mobile des durées
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class OverloadedError(Exception):
+    """Requête refusée par le contrôle d'admission"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+@dataclass
+class _EndpointState:
+    max_concurrent: int
+    max_queue: int
+    service_time: float  # Moyenne mobile du temps moteur d'une requête admise (s)
+    semaphore: asyncio.Semaphore = field(init=False)
+    active: int = 0
+    queued: int = 0
+    clients: dict[str, int] = field(default_factory=dict)  # Requêtes admises par client
+
+    def __post_init__(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    def client_limit(self) -> int:
+        """Part équitable : jamais plus de CLIENT_MAX_SHARE des places, et une part égale
+        entre les clients présents"""
+        slots = self.max_concurrent + self.max_queue
+        share = min(int(slots * CLIENT_MAX_SHARE), slots // max(1, len(self.clients)))
+        return max(1, share)
+
+    def pending_work(self) -> float:
+        """Temps moteur estimé des requêtes admises et pas encore terminées"""
+        return (self.active + self.queued) * self.service_time
+
+
+@dataclass
+class Ticket:
+    """Droit d'accès accordé à une requête"""
+
+    endpoint: str
+    pressure: float  # Attente estimée / attente maximale, à l'admission
+    degraded_depth: int
+    degrade_pressure: float
+
+    @property
+    def degraded(self) -> bool:
+        return self.pressure >= self.degrade_pressure
+
+    def depth(self, requested: int) -> int:
+        """Profondeur à utiliser : réduite quand le service est sous pression"""
+        if self.degraded:
+            return min(requested, self.degraded_depth)
+        return requested
+
+
+class AdmissionController:
+    """Limites de concurrence, de file et de part par client, attente estimée sur le moteur"""
+
+    def __init__(
+        self,
+        limits: dict[str, tuple[int, int, float]],
+        max_wait: float,
+        degrade_pressure: float,
+        degraded_depth: int,
+    ) -> None:
+        if not 0 <= degrade_pressure < 1:
+            raise ValueError(
+                "ADMISSION_DEGRADE_PRESSURE must be in [0, 1): depth must be reduced before rejecting"
+            )
+        for name, (_, _, service_time) in limits.items():
+            if service_time >= max_wait:
+                raise ValueError(
+                    f"{name} service time ({service_time}s) must be below ADMISSION_MAX_WAIT_S "
+                    f"({max_wait}s), otherwise its queue is never used"
+                )
+        self._endpoints = {
+            name: _EndpointState(max_concurrent, max_queue, service_time)
+            for name, (max_concurrent, max_queue, service_time) in limits.items()
+        }
+        self._max_wait = max_wait
+        self._degrade_pressure = degrade_pressure
+        self.degraded_depth = degraded_depth
+        self.rejected = {"queue_full": 0, "wait_too_long": 0, "fair_share": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """
+        Configuration par variables d'environnement
+
+        ADMISSION_LIMITS="analyze-game=1:4,analyze-position=4:16" remplace les
+        limites (en cours:file) des endpoints cités.
+        """
+        limits = dict(DEFAULT_LIMITS)
+        for item in filter(None, os.getenv("ADMISSION_LIMITS", "").split(",")):
+            name, _, values = item.strip().partition("=")
+            max_concurrent, _, max_queue = values.partition(":")
+            service_time = limits.get(name, (0, 0, 1.0))[2]
+            limits[name] = (int(max_concurrent), int(max_queue), service_time)
+        return cls(
+            limits,
+            max_wait=float(os.getenv("ADMISSION_MAX_WAIT_S", "60")),
+            degrade_pressure=float(os.getenv("ADMISSION_DEGRADE_PRESSURE", "0.5")),
+            degraded_depth=int(os.getenv("ADMISSION_DEGRADED_DEPTH", "10")),
+        )
+
+    def estimated_wait(self) -> float:
+        """
+        Attente estimée avant qu'une nouvelle requête obtienne le moteur
+
+        Le verrou du moteur sert les requêtes dans l'ordre : tout le travail déjà
+        admis, quel que soit l'endpoint, passe avant. Les requêtes en cours sont
+        comptées en entier (estimation prudente).
+        """
+        return sum(state.pending_work() for state in self._endpoints.values())
+
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: float) -> None:
+        self.rejected[reason] += 1
+        logger.warning(f"[Admission] Requête refusée ({reason}): {detail}")
+        raise OverloadedError(status_code, detail, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str, client_id: str) -> AsyncIterator[Ticket]:
+        """Réserve une place pour la requête ou lève OverloadedError immédiatement"""
+        state = self._endpoints[endpoint]
+        client_load = state.clients.get(client_id, 0)
+        wait = self.estimated_wait()
+
+        if client_load > 0 and client_load >= state.client_limit():
+            self._reject(
+                "fair_share",
+                429,
+                f"Too many concurrent {endpoint} requests for client (limit {state.client_limit()})",
+                state.service_time,
+            )
+        if state.active >= state.max_concurrent and state.queued >= state.max_queue:
+            self._reject("queue_full", 503, f"{endpoint} queue is full", wait)
+        if wait > self._max_wait:
+            self._reject(
+                "wait_too_long", 503, f"{endpoint} estimated wait {wait:.1f}s is too long", wait
+            )
+
+        ticket = Ticket(
+            endpoint=endpoint,
+            pressure=wait / self._max_wait if self._max_wait > 0 else 0.0,
+            degraded_depth=self.degraded_depth,
+            degrade_pressure=self._degrade_pressure,
+        )
+        state.clients[client_id] = client_load + 1
+        state.queued += 1
+        acquired = False
+        try:
+            await state.semaphore.acquire()
+            acquired = True
+            state.queued -= 1
+            state.active += 1
+            try:
+                with track_engine_time() as engine_time:
+                    yield ticket
+            finally:
+                state.active -= 1
+                # Seul le temps passé à détenir le moteur compte : l'attente du verrou
+                # derrière les autres endpoints est déjà dans estimated_wait
+                if engine_time[0] > 0:
+                    state.service_time += SERVICE_TIME_SMOOTHING * (
+                        engine_time[0] - state.service_time
+                    )
+        finally:
+            if acquired:
+                state.semaphore.release()
+            else:
+                state.queued -= 1
+            remaining = state.clients[client_id] - 1
+            if remaining:
+                state.clients[client_id] = remaining
+            else:
+                del state.clients[client_id]
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """État courant de chaque endpoint (pour le monitoring)"""
+        return {
+            name: {
+                "active": state.active,
+                "queued": state.queued,
+                "max_concurrent": state.max_concurrent,
+                "max_queue": state.max_queue,
+                "clients": len(state.clients),
+                "service_time_s": round(state.service_time, 3),
+                "pending_work_s": round(state.pending_work(), 3),
+            }
+            for name, state in self._endpoints.items()
+        }
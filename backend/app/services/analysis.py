@@ -8,6 +8,7 @@ import chess
 import chess.engine
 
 from app.models import AnalyzeResponse
+from app.services.profiling import record, span
 
 logger = logging.getLogger(__name__)
 
@@ -28,14 +29,23 @@ async def analyze_position(
     try:
         loop = asyncio.get_event_loop()
 
+        # Instants mesurés dans le thread de l'executor : [début, fin] de la recherche
+        engine_times = [0.0, 0.0]
+
         def _analyse() -> chess.engine.InfoDict:
+            engine_times[0] = time.perf_counter()
             limit = chess.engine.Limit(depth=depth)
             logger.info(f"[Analysis] Envoi commande à Stockfish: depth={depth}")
             result = engine.analyse(board, limit)
             logger.info("[Analysis] Stockfish a terminé l'analyse")
+            engine_times[1] = time.perf_counter()
             return result
 
+        submitted = time.perf_counter()
         info = await loop.run_in_executor(None, _analyse)
+        # Attente d'un thread + retour dans la boucle, séparés du temps Stockfish
+        record("stockfish", engine_times[1] - engine_times[0])
+        record("executor", (engine_times[0] - submitted) + (time.perf_counter() - engine_times[1]))
         logger.info(
             f"[Analysis] Analyse terminée - depth atteint: {info.get('depth')}, nodes: {info.get('nodes')}"
         )
@@ -75,15 +85,16 @@ async def analyze_position(
             evaluation_type = "cp"
             logger.info(f"[Analysis] Évaluation: {evaluation} centipawns (du point de vue des blancs)")
 
-    result = AnalyzeResponse(
-        best_move=best_move_uci,  # Toujours en UCI (format standard)
-        evaluation=evaluation,
-        evaluation_type=evaluation_type,
-        depth=int(info.get("depth", depth)),
-        mate_in=mate_in,
-        nodes=info.get("nodes"),
-        analysis_time_ms=round(elapsed_ms, 2),
-    )
+    with span("pydantic"):
+        result = AnalyzeResponse(
+            best_move=best_move_uci,  # Toujours en UCI (format standard)
+            evaluation=evaluation,
+            evaluation_type=evaluation_type,
+            depth=int(info.get("depth", depth)),
+            mate_in=mate_in,
+            nodes=info.get("nodes"),
+            analysis_time_ms=round(elapsed_ms, 2),
+        )
 
     logger.info(
         f"[Analysis] Réponse préparée - best_move={best_move_uci} (UCI), "
@@ -92,6 +103,33 @@ async def analyze_position(
     return result
 
 
+async def analyze_multipv(
+    board: chess.Board,
+    engine: chess.engine.SimpleEngine,
+    depth: int,
+    multipv: int,
+) -> list[chess.engine.InfoDict]:
+    """
+    Analyse une position en MultiPV
+
+    Retourne une ligne par variante, de la meilleure à la moins bonne
+    (moins de `multipv` lignes s'il y a moins de coups légaux).
+    """
+    loop = asyncio.get_event_loop()
+
+    def _analyse() -> list[chess.engine.InfoDict]:
+        return engine.analyse(board, chess.engine.Limit(depth=depth), multipv=multipv)
+
+    try:
+        return await loop.run_in_executor(None, _analyse)
+    except chess.engine.EngineTerminatedError as exc:
+        logger.error(f"[Analysis] Stockfish engine terminé: {exc}")
+        raise RuntimeError("Stockfish engine terminated") from exc
+    except chess.engine.EngineError as exc:
+        logger.error(f"[Analysis] Erreur Stockfish: {exc}")
+        raise RuntimeError(f"Stockfish error: {exc}") from exc
+
+
 def handle_terminal_position(board: chess.Board) -> AnalyzeResponse:
     """Gère les positions terminales (checkmate, stalemate, draw)"""
     logger.info("[Analysis] Position terminale détectée")
@@ -0,0 +1,362 @@
+"""Classification vectorisée (NumPy) d'une série de coups
+
+Équivalent par lot de `classify_move` : mêmes seuils, mêmes priorités de cas,
+résultats identiques coup par coup.
+
+Entrée prévue : des colonnes déjà sous forme de tableaux NumPy, par exemple un
+export colonne `.npz` chargé avec `load_columns`. Des listes Python sont
+acceptées, mais leur conversion coûte alors plus cher que la boucle sur
+`classify_move` : pour des données ligne par ligne (JSON, `/reclassify`), la
+fonction scalaire reste la plus rapide.
+
+Pour reclassifier tout l'historique, l'export JSONL est converti une fois en
+`.npz` (`columns_from_games` + `save_columns`), puis chaque changement de
+seuils ne coûte qu'un `load_columns` + `reclassify_columns`
+(voir scripts/reclassify.py).
+"""
+import os
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from app.models import GAME_PHASES, MOVE_QUALITIES, ReclassifyGame
+from app.services.game_analysis import (
+    CLASSIFICATION_VERSION,
+    EXCELLENT_MAX_LOSS,
+    GOOD_MAX_LOSS,
+    INACCURACY_MAX_LOSS,
+    MATED_LOSS,
+    MIDDLEGAME_LAST_MOVE,
+    MISS_LOSS_TOLERANCE,
+    MISS_MIN_OPPORTUNITY,
+    MISTAKE_MAX_LOSS,
+    OPENING_LAST_MOVE,
+    SLOWER_MATE_LOSS_PER_MOVE,
+)
+from app.services.reclassification import evaluation_before_cp, mover_is_white
+
+# Colonnes attendues par classify_moves (noms de ses arguments)
+COLUMNS = (
+    "eval_before",
+    "eval_after",
+    "eval_best_after",
+    "is_white",
+    "played_moves",
+    "best_moves",
+    "move_numbers",
+    "eval_types_after",
+    "mates_in_after",
+    "eval_types_best_after",
+    "mates_in_best_after",
+)
+
+# Colonnes d'identification des parties dans un export (voir columns_from_games)
+GAME_COLUMNS = ("game_index", "game_ids")
+
+_BEST, _EXCELLENT, _GOOD, _INACCURACY, _MISTAKE, _BLUNDER, _MISS = (
+    MOVE_QUALITIES.index(name)
+    for name in ("best", "excellent", "good", "inaccuracy", "mistake", "blunder", "miss")
+)
+
+
+@dataclass
+class BatchClassification:
+    """Résultat de la classification d'un lot de coups (codes des tables de `app.models`)"""
+
+    move_quality: np.ndarray  # int8, index dans MOVE_QUALITIES
+    game_phase: np.ndarray  # int8, index dans GAME_PHASES
+    evaluation_loss: np.ndarray  # float64, en centipawns
+
+    def __len__(self) -> int:
+        return len(self.move_quality)
+
+    def move_qualities(self) -> list[str]:
+        return [MOVE_QUALITIES[code] for code in self.move_quality.tolist()]
+
+    def game_phases(self) -> list[str]:
+        return [GAME_PHASES[code] for code in self.game_phase.tolist()]
+
+
+def load_columns(path: Union[str, os.PathLike]) -> dict[str, np.ndarray]:
+    """
+    Charge un export colonne `.npz` (un tableau par nom de COLUMNS, et GAME_COLUMNS
+    s'il vient de `columns_from_games`)
+
+    Les valeurs absentes sont NaN (nombres) ou "" (coups, types d'évaluation).
+    Le résultat se passe à `classify_columns`.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        missing = [name for name in COLUMNS[:9] if name not in data.files]
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans {path}: {', '.join(missing)}")
+        return {name: data[name] for name in COLUMNS + GAME_COLUMNS if name in data.files}
+
+
+def save_columns(path: Union[str, os.PathLike], columns: dict[str, np.ndarray]) -> None:
+    """Écrit un export colonne `.npz` relisible par `load_columns`"""
+    np.savez(path, **columns)
+
+
+def _cp_or_nan(pawns: Optional[float]) -> float:
+    return np.nan if pawns is None else round(pawns * 100)
+
+
+def columns_from_games(games: Iterable[ReclassifyGame]) -> dict[str, np.ndarray]:
+    """
+    Convertit des analyses stockées (une partie par élément) en colonnes
+
+    Une ligne par coup, évaluations en centipawns. Même déduction de l'évaluation
+    avant le coup et du camp que `reclassify_game` : une évaluation avant inconnue
+    reste NaN et le coup sera listé dans `skipped`. `game_index` donne la partie de
+    chaque ligne, `game_ids` l'identifiant de chaque partie ("" si absent).
+    """
+    rows: dict[str, list] = {name: [] for name in COLUMNS + ("game_index",)}
+    game_ids: list[str] = []
+    for index, game in enumerate(games):
+        game_ids.append(game.game_id or "")
+        previous = None
+        for analysis in game.analyses:
+            eval_before = evaluation_before_cp(analysis, previous)
+            previous = analysis
+            rows["eval_before"].append(np.nan if eval_before is None else eval_before)
+            rows["eval_after"].append(_cp_or_nan(analysis.evaluation))
+            rows["eval_best_after"].append(_cp_or_nan(analysis.evaluation_best_after))
+            rows["is_white"].append(mover_is_white(analysis))
+            rows["played_moves"].append(analysis.played_move)
+            rows["best_moves"].append(analysis.best_move or "")
+            rows["move_numbers"].append(analysis.move_number)
+            rows["eval_types_after"].append(analysis.evaluation_type)
+            rows["mates_in_after"].append(
+                np.nan if analysis.mate_in is None else analysis.mate_in
+            )
+            rows["eval_types_best_after"].append(analysis.evaluation_type_best_after or "")
+            rows["mates_in_best_after"].append(
+                np.nan if analysis.mate_in_best_after is None else analysis.mate_in_best_after
+            )
+            rows["game_index"].append(index)
+
+    columns = {
+        "eval_before": np.array(rows["eval_before"], dtype=np.float64),
+        "eval_after": np.array(rows["eval_after"], dtype=np.float64),
+        "eval_best_after": np.array(rows["eval_best_after"], dtype=np.float64),
+        "is_white": np.array(rows["is_white"], dtype=bool),
+        "move_numbers": np.array(rows["move_numbers"], dtype=np.int64),
+        "mates_in_after": np.array(rows["mates_in_after"], dtype=np.float64),
+        "mates_in_best_after": np.array(rows["mates_in_best_after"], dtype=np.float64),
+        "game_index": np.array(rows["game_index"], dtype=np.int64),
+        "game_ids": np.array(game_ids, dtype=str),
+    }
+    for name in ("played_moves", "best_moves", "eval_types_after", "eval_types_best_after"):
+        columns[name] = np.array(rows[name], dtype=str)
+    return columns
+
+
+def classify_columns(columns: dict[str, np.ndarray]) -> BatchClassification:
+    """`classify_moves` sur les colonnes d'un export (les colonnes de partie sont ignorées)"""
+    return classify_moves(**{name: columns[name] for name in COLUMNS if name in columns})
+
+
+def reclassify_columns(columns: dict[str, np.ndarray]) -> Iterator[dict]:
+    """
+    Reclassifie un export colonne, une partie par élément produit
+
+    Équivalent vectorisé de `reclassify_games` : mêmes résultats, au format
+    `ReclassifiedGame`. Nécessite les colonnes GAME_COLUMNS.
+    """
+    missing = [name for name in GAME_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Colonnes de partie manquantes: {', '.join(missing)}")
+
+    known = ~np.isnan(columns["eval_before"])
+    result = classify_columns(
+        {name: columns[name][known] for name in COLUMNS if name in columns}
+    )
+    qualities = result.move_qualities()
+    phases = result.game_phases()
+    losses = result.evaluation_loss.tolist()
+
+    move_numbers = columns["move_numbers"].tolist()
+    known_rows = known.tolist()
+    game_index = columns["game_index"]
+    # Lignes de chaque partie : les exports sont écrits partie après partie
+    bounds = np.searchsorted(game_index, np.arange(len(columns["game_ids"]) + 1)).tolist()
+    classified = 0
+    for index, game_id in enumerate(columns["game_ids"].tolist()):
+        analyses: list[dict] = []
+        skipped: list[int] = []
+        for row in range(bounds[index], bounds[index + 1]):
+            if not known_rows[row]:
+                skipped.append(move_numbers[row])
+                continue
+            analyses.append(
+                {
+                    "move_number": move_numbers[row],
+                    "move_quality": qualities[classified],
+                    "game_phase": phases[classified],
+                    "evaluation_loss": losses[classified],
+                }
+            )
+            classified += 1
+        yield {
+            "game_id": game_id or None,
+            "classification_version": CLASSIFICATION_VERSION,
+            "analyses": analyses,
+            "skipped": skipped,
+        }
+
+
+def _as_float(values: Sequence[Optional[float]]) -> np.ndarray:
+    """Convertit en float64, None devient NaN"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def _is_mate(types: Optional[Sequence[Optional[str]]], size: int) -> np.ndarray:
+    if types is None:
+        return np.zeros(size, dtype=bool)
+    types = np.asarray(types)
+    if types.dtype.kind != "U":
+        types = types.astype(object)
+    return types == "mate"
+
+
+def _same_moves(
+    played_moves: Sequence[str],
+    best_moves: Sequence[Optional[str]],
+) -> np.ndarray:
+    """
+    `best and played.lower() == best.lower()` en vectorisé
+
+    Les coups UCI sont en ASCII : la mise en minuscules se fait directement sur
+    les points de code, bien plus vite que `np.char.lower`.
+    """
+    if isinstance(best_moves, np.ndarray) and best_moves.dtype.kind == "U":
+        best_str = best_moves  # Export colonne : "" pour un coup absent
+    else:
+        best = np.asarray(best_moves, dtype=object)
+        best[best == None] = ""  # noqa: E711 - comparaison élément par élément
+        best_str = best.astype(str)
+    played_str = np.asarray(played_moves, dtype=str)
+    width = max(played_str.dtype.itemsize, best_str.dtype.itemsize) // 4
+    size = len(best_str)
+
+    def _lowered(moves: np.ndarray) -> np.ndarray:
+        codes = moves.astype(f"U{width}").view(np.uint32).reshape(size, width)
+        return codes + ((codes >= 65) & (codes <= 90)) * np.uint32(32)
+
+    return (best_str != "") & (_lowered(played_str) == _lowered(best_str)).all(axis=1)
+
+
+def _quality_from_loss(loss: np.ndarray) -> np.ndarray:
+    return np.select(
+        [
+            loss < EXCELLENT_MAX_LOSS,
+            loss < GOOD_MAX_LOSS,
+            loss < INACCURACY_MAX_LOSS,
+            loss < MISTAKE_MAX_LOSS,
+        ],
+        [_EXCELLENT, _GOOD, _INACCURACY, _MISTAKE],
+        default=_BLUNDER,
+    )
+
+
+def classify_moves(
+    eval_before: Sequence[int],
+    eval_after: Sequence[int],
+    eval_best_after: Sequence[Optional[int]],
+    is_white: Sequence[bool],
+    played_moves: Sequence[str],
+    best_moves: Sequence[Optional[str]],
+    move_numbers: Sequence[int],
+    eval_types_after: Sequence[str],
+    mates_in_after: Sequence[Optional[int]],
+    eval_types_best_after: Optional[Sequence[Optional[str]]] = None,
+    mates_in_best_after: Optional[Sequence[Optional[int]]] = None,
+) -> BatchClassification:
+    """
+    Classifie un lot de coups en une passe vectorisée
+
+    Chaque argument est la colonne de l'argument homonyme de `classify_move`.
+    Les lots de plusieurs parties sont simplement concaténés. Rapide sur des
+    tableaux NumPy (voir `load_columns`) ; sur des listes, préférer classify_move.
+    """
+    before = _as_float(eval_before)
+    after = _as_float(eval_after)
+    best_after = _as_float(eval_best_after)
+    size = len(before)
+    white = np.asarray(is_white, dtype=bool)
+    numbers = np.asarray(move_numbers, dtype=np.int64)
+    mate_in_after = _as_float(mates_in_after)
+    mate_in_best_after = (
+        _as_float(mates_in_best_after)
+        if mates_in_best_after is not None
+        else np.full(size, np.nan)
+    )
+
+    is_best = _same_moves(played_moves, best_moves)
+
+    game_phase = np.where(
+        numbers <= OPENING_LAST_MOVE,
+        GAME_PHASES.index("opening"),
+        np.where(
+            numbers <= MIDDLEGAME_LAST_MOVE,
+            GAME_PHASES.index("middlegame"),
+            GAME_PHASES.index("endgame"),
+        ),
+    ).astype(np.int8)
+
+    with np.errstate(invalid="ignore"):
+        # Cas de mat, dans l'ordre de priorité de classify_move
+        mate_after = _is_mate(eval_types_after, size) & ~np.isnan(mate_in_after)
+        mated = mate_after & (mate_in_after < 0)
+        mating = mate_after & (mate_in_after > 0)
+        best_also_mates = (
+            _is_mate(eval_types_best_after, size)
+            & ~np.isnan(mate_in_best_after)
+            & (mate_in_best_after > 0)
+        )
+        mate_as_fast = mating & best_also_mates & (mate_in_after <= mate_in_best_after)
+        mate_slower = mating & best_also_mates & (mate_in_after > mate_in_best_after)
+        mate_not_best = mating & ~best_also_mates
+        slower_loss = (mate_in_after - mate_in_best_after) * SLOWER_MATE_LOSS_PER_MOVE
+        slower_quality = np.select(
+            [slower_loss < EXCELLENT_MAX_LOSS, slower_loss < GOOD_MAX_LOSS],
+            [_EXCELLENT, _GOOD],
+            default=_INACCURACY,
+        )
+
+        # Cas standard, du point de vue du joueur qui joue
+        both_zero = (before == 0) & (after == 0)
+        sign = np.where(white, 1.0, -1.0)
+        before_pov = before * sign
+        after_pov = after * sign
+        best_after_pov = best_after * sign
+        has_best_after = ~np.isnan(best_after)
+        standard_loss = np.where(
+            has_best_after,
+            np.abs(after_pov - best_after_pov),
+            np.abs(after_pov - before_pov),
+        )
+        miss = (
+            has_best_after
+            & (best_after_pov - after_pov >= MISS_MIN_OPPORTUNITY)
+            & (after_pov >= before_pov - MISS_LOSS_TOLERANCE)
+        )
+
+    conditions = [is_best, mated, mate_as_fast, mate_slower, mate_not_best, both_zero, miss]
+    move_quality = np.select(
+        conditions,
+        [_BEST, _BLUNDER, _BEST, slower_quality, _EXCELLENT, _GOOD, _MISS],
+        default=_quality_from_loss(standard_loss),
+    ).astype(np.int8)
+    evaluation_loss = np.select(
+        conditions,
+        [0.0, MATED_LOSS, 0.0, slower_loss, 0.0, 0.0, standard_loss],
+        default=standard_loss,
+    ).astype(np.float64)
+
+    return BatchClassification(
+        move_quality=move_quality,
+        game_phase=game_phase,
+        evaluation_loss=evaluation_loss,
+    )
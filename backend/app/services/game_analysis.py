@@ -10,9 +10,26 @@ import chess.pgn
 
 from app.models import GameAnalysisResponse
 from app.services.analysis import analyze_position
+from app.services.profiling import span
 
 logger = logging.getLogger(__name__)
 
+# Version de la classification : à incrémenter à chaque changement de seuil ou
+# de logique dans classify_move (les résultats stockés deviennent obsolètes)
+CLASSIFICATION_VERSION = 1
+
+# Seuils de classification (partagés avec la classification par lot)
+OPENING_LAST_MOVE = 20
+MIDDLEGAME_LAST_MOVE = 40
+EXCELLENT_MAX_LOSS = 10
+GOOD_MAX_LOSS = 30
+INACCURACY_MAX_LOSS = 100
+MISTAKE_MAX_LOSS = 300
+MISS_MIN_OPPORTUNITY = 100  # Écart minimal avec le meilleur coup pour un "miss"
+MISS_LOSS_TOLERANCE = 10  # Perte tolérée par rapport à l'évaluation avant le coup
+MATED_LOSS = 10000.0  # Perte attribuée à un coup qui mène à se faire mater
+SLOWER_MATE_LOSS_PER_MOVE = 1000.0
+
 
 @dataclass
 class MoveAnalysisResult:
@@ -20,6 +37,7 @@ class MoveAnalysisResult:
 
     move_number: int
     fen_before: str
+    is_white: bool  # Camp qui joue le coup
     played_move: str
     best_move: Optional[str]
     opponent_best_move: Optional[str]  # Meilleur coup de l'adversaire après le coup joué
@@ -27,6 +45,9 @@ class MoveAnalysisResult:
     evaluation_after: int  # centipawns
     evaluation_type_after: str  # "cp" ou "mate"
     mate_in_after: Optional[int]  # Nombre de coups jusqu'au mat (si evaluation_type_after == "mate")
+    evaluation_best_after: Optional[int]  # centipawns, après le meilleur coup (si différent)
+    evaluation_type_best_after: Optional[str]
+    mate_in_best_after: Optional[int]
     move_quality: str
     game_phase: str
     evaluation_loss: float  # centipawns
@@ -52,9 +73,9 @@ def classify_move(
     game_phase: "opening", "middlegame", "endgame"
     evaluation_loss: en centipawns
     """
-    if move_number <= 20:
+    if move_number <= OPENING_LAST_MOVE:
         game_phase = "opening"
-    elif move_number <= 40:
+    elif move_number <= MIDDLEGAME_LAST_MOVE:
         game_phase = "middlegame"
     else:
         game_phase = "endgame"
@@ -72,7 +93,7 @@ def classify_move(
             # Le coup joué mène à un mat pour le joueur qui vient de jouer
             # C'est toujours un blunder grave
             # La perte est énorme (on utilise 10000 centipawns comme référence)
-            return ("blunder", game_phase, 10000.0)
+            return ("blunder", game_phase, MATED_LOSS)
         elif mate_in_after > 0:
             # Le coup joué mène à un mat pour l'adversaire
             # Vérifier si le meilleur coup menait aussi au mat
@@ -87,10 +108,10 @@ def classify_move(
                     return ("best", game_phase, 0.0)
                 else:
                     # Le coup joué mate moins vite
-                    evaluation_loss = (mate_in_after - mate_in_best_after) * 1000.0
-                    if evaluation_loss < 10:
+                    evaluation_loss = (mate_in_after - mate_in_best_after) * SLOWER_MATE_LOSS_PER_MOVE
+                    if evaluation_loss < EXCELLENT_MAX_LOSS:
                         return ("excellent", game_phase, evaluation_loss)
-                    elif evaluation_loss < 30:
+                    elif evaluation_loss < GOOD_MAX_LOSS:
                         return ("good", game_phase, evaluation_loss)
                     else:
                         return ("inaccuracy", game_phase, evaluation_loss)
@@ -130,19 +151,19 @@ def classify_move(
         # 2. Le meilleur coup aurait donné un avantage significatif (>= 100 cp de différence)
         # 3. Le meilleur coup est meilleur que le coup joué
         if (
-            missed_opportunity >= 100  # Opportunité manquée significative
-            and eval_after >= eval_before - 10  # Pas de perte significative
+            missed_opportunity >= MISS_MIN_OPPORTUNITY  # Opportunité manquée significative
+            and eval_after >= eval_before - MISS_LOSS_TOLERANCE  # Pas de perte significative
         ):
             return ("miss", game_phase, evaluation_loss)
 
     # Classifier selon la perte d'évaluation
-    if evaluation_loss < 10:
+    if evaluation_loss < EXCELLENT_MAX_LOSS:
         move_quality = "excellent"
-    elif evaluation_loss < 30:
+    elif evaluation_loss < GOOD_MAX_LOSS:
         move_quality = "good"
-    elif evaluation_loss < 100:
+    elif evaluation_loss < INACCURACY_MAX_LOSS:
         move_quality = "inaccuracy"
-    elif evaluation_loss < 300:
+    elif evaluation_loss < MISTAKE_MAX_LOSS:
         move_quality = "mistake"
     else:
         move_quality = "blunder"
@@ -183,7 +204,8 @@ async def _analyze_move(
     move_number: int,
 ) -> MoveAnalysisResult:
     """Analyse un coup unique et retourne un résultat structuré."""
-    fen_before = board.fen()
+    with span("board_fen"):
+        fen_before = board.fen()
     is_white = board.turn == chess.WHITE
 
     (
@@ -210,8 +232,9 @@ async def _analyze_move(
     mate_in_best_after: Optional[int] = None
     if best_move_uci and best_move_uci.lower() != move_uci.lower():
         try:
-            temp_board = chess.Board(fen_before)
-            temp_board.push(chess.Move.from_uci(best_move_uci))
+            with span("board_copy"):
+                temp_board = chess.Board(fen_before)
+                temp_board.push(chess.Move.from_uci(best_move_uci))
             if not temp_board.is_game_over():
                 (
                     eval_best_after,
@@ -226,23 +249,25 @@ async def _analyze_move(
                 exc,
             )
 
-    move_quality, game_phase, evaluation_loss = classify_move(
-        eval_before,
-        eval_after,
-        eval_best_after,
-        is_white,
-        move_uci,
-        best_move_uci,
-        move_number,
-        eval_type_after,
-        mate_in_after,
-        eval_type_best_after,
-        mate_in_best_after,
-    )
+    with span("classify"):
+        move_quality, game_phase, evaluation_loss = classify_move(
+            eval_before,
+            eval_after,
+            eval_best_after,
+            is_white,
+            move_uci,
+            best_move_uci,
+            move_number,
+            eval_type_after,
+            mate_in_after,
+            eval_type_best_after,
+            mate_in_best_after,
+        )
 
     return MoveAnalysisResult(
         move_number=move_number,
         fen_before=fen_before,
+        is_white=is_white,
         played_move=move_uci,
         best_move=best_move_uci,
         opponent_best_move=opponent_best_move_uci,
@@ -250,12 +275,29 @@ async def _analyze_move(
         evaluation_after=eval_after,
         evaluation_type_after=eval_type_after,
         mate_in_after=mate_in_after,
+        evaluation_best_after=eval_best_after,
+        evaluation_type_best_after=eval_type_best_after,
+        mate_in_best_after=mate_in_best_after,
         move_quality=move_quality,
         game_phase=game_phase,
         evaluation_loss=evaluation_loss,
     )
 
 
+def parse_pgn(pgn: str) -> chess.pgn.Game:
+    """Parse la partie (ligne principale et position de départ), ValueError si invalide"""
+    try:
+        with span("pgn_parse"):
+            pgn_io = io.StringIO(pgn)
+            game = chess.pgn.read_game(pgn_io)
+        if not game:
+            raise ValueError("PGN invalide ou vide")
+    except Exception as exc:  # noqa: BLE001
+        logger.error("[GameAnalysis] Erreur parsing PGN: %s", exc)
+        raise ValueError(f"PGN invalide: {exc}") from exc
+    return game
+
+
 async def analyze_game(
     pgn: str,
     engine: chess.engine.SimpleEngine,
@@ -266,27 +308,28 @@ async def analyze_game(
 
     Retourne toutes les analyses prêtes à être insérées dans la DB
     """
-    logger.info("[GameAnalysis] Début analyse partie (depth=%s)", depth)
+    return await analyze_parsed_game(parse_pgn(pgn), engine, depth)
 
-    try:
-        pgn_io = io.StringIO(pgn)
-        game = chess.pgn.read_game(pgn_io)
-        if not game:
-            raise ValueError("PGN invalide ou vide")
-    except Exception as exc:  # noqa: BLE001
-        logger.error("[GameAnalysis] Erreur parsing PGN: %s", exc)
-        raise ValueError(f"PGN invalide: {exc}") from exc
+
+async def analyze_parsed_game(
+    game: chess.pgn.Game,
+    engine: chess.engine.SimpleEngine,
+    depth: int,
+) -> list[GameAnalysisResponse]:
+    """Comme `analyze_game`, pour une partie déjà parsée (ex. lors du calcul de la clé de cache)"""
+    logger.info("[GameAnalysis] Début analyse partie (depth=%s)", depth)
 
     board = game.board()
     analyses: list[GameAnalysisResponse] = []
 
     for move_number, move in enumerate(game.mainline_moves(), start=1):
         move_uci = move.uci()
-        logger.info(
-            "[GameAnalysis] Analyse coup %s - FEN: %s...",
-            move_number,
-            board.fen()[:50],
-        )
+        with span("board_fen"):
+            logger.info(
+                "[GameAnalysis] Analyse coup %s - FEN: %s...",
+                move_number,
+                board.fen()[:50],
+            )
 
         try:
             result = await _analyze_move(board, move_uci, engine, depth, move_number)
@@ -299,20 +342,30 @@ async def analyze_game(
             )
             continue
 
-        analyses.append(
-            GameAnalysisResponse(
-                move_number=result.move_number,
-                fen=result.fen_before,
-                evaluation=result.evaluation_after / 100.0,
-                best_move=result.best_move,
-                played_move=result.played_move,
-                move_quality=result.move_quality,
-                game_phase=result.game_phase,
-                evaluation_loss=result.evaluation_loss,
-                evaluation_type=result.evaluation_type_after,
-                mate_in=result.mate_in_after,
+        with span("pydantic"):
+            analyses.append(
+                GameAnalysisResponse(
+                    move_number=result.move_number,
+                    fen=result.fen_before,
+                    evaluation=result.evaluation_after / 100.0,
+                    best_move=result.best_move,
+                    played_move=result.played_move,
+                    move_quality=result.move_quality,
+                    game_phase=result.game_phase,
+                    evaluation_loss=result.evaluation_loss,
+                    evaluation_type=result.evaluation_type_after,
+                    mate_in=result.mate_in_after,
+                    evaluation_before=result.evaluation_before / 100.0,
+                    is_white=result.is_white,
+                    evaluation_best_after=(
+                        result.evaluation_best_after / 100.0
+                        if result.evaluation_best_after is not None
+                        else None
+                    ),
+                    evaluation_type_best_after=result.evaluation_type_best_after,
+                    mate_in_best_after=result.mate_in_best_after,
+                )
             )
-        )
 
         logger.info(
             "[GameAnalysis] Coup %s analysé - quality=%s, loss=%.1fcp, eval_type=%s, mate_in=%s",
@@ -0,0 +1,148 @@
+"""Cache des analyses de parties complètes
+
+Une même partie est souvent renvoyée à `/analyze-game` (resynchronisation,
+réinstallation, migration d'un compte invité). La clé ne dépend que de la
+position de départ et des coups de la ligne principale : en-têtes, commentaires
+et variantes du PGN sont ignorés. La profondeur et la version de classification
+en font partie, un changement de seuils invalide donc les entrées existantes.
+
+Les analyses sont stockées en JSON compressé (zlib) et le cache est borné en
+octets, avec éviction LRU. Deux requêtes identiques simultanées ne lancent
+qu'une analyse : la seconde attend le résultat de la première (single-flight).
+"""
+import asyncio
+import hashlib
+import logging
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import chess.pgn
+import orjson
+
+from app.models import GameAnalysisResponse
+from app.services.game_analysis import CLASSIFICATION_VERSION, parse_pgn
+
+logger = logging.getLogger(__name__)
+
+ZLIB_LEVEL = 6
+
+
+# Résultat partagé d'une analyse en cours : (analyses, profondeur utilisée), None si échec
+SharedAnalysis = Optional[tuple[list[GameAnalysisResponse], int]]
+
+
+class CanonicalGame:
+    """
+    Partie parsée une seule fois, pour la clé de cache puis pour l'analyse
+
+    La forme canonique est la position de départ + les coups UCI de la ligne principale.
+    """
+
+    def __init__(self, pgn: str) -> None:
+        """Lève ValueError si le PGN est invalide ou vide"""
+        self.game: chess.pgn.Game = parse_pgn(pgn)
+        moves = [move.uci() for move in self.game.mainline_moves()]
+        self.plies = len(moves)
+        self._canonical = f"{self.game.board().fen()}|{' '.join(moves)}"
+
+    def key(self, depth: int) -> str:
+        """Clé de cache à cette profondeur (sans nouveau parsing)"""
+        return hashlib.sha256(
+            f"{CLASSIFICATION_VERSION}|{depth}|{self._canonical}".encode()
+        ).hexdigest()
+
+
+class GameCache:
+    """Cache LRU borné en octets des analyses de parties"""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0  # Requêtes servies par l'analyse en cours d'une autre
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[list[GameAnalysisResponse]]:
+        """Analyses en cache pour cette clé, sinon None"""
+        blob = self._entries.get(key)
+        if blob is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Données validées lors de la mise en cache : pas de nouvelle validation
+        return [
+            GameAnalysisResponse.model_construct(**analysis)
+            for analysis in orjson.loads(zlib.decompress(blob))
+        ]
+
+    def put(self, key: str, analyses: list[GameAnalysisResponse]) -> None:
+        if self._max_bytes <= 0:
+            return
+        blob = zlib.compress(orjson.dumps([a.__dict__ for a in analyses]), ZLIB_LEVEL)
+        if len(blob) > self._max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= len(previous)
+        self._entries[key] = blob
+        self.size_bytes += len(blob)
+        while self.size_bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    async def wait_inflight(self, key: str) -> SharedAnalysis:
+        """Résultat de l'analyse en cours pour cette clé ; None si aucune ou si elle a échoué"""
+        future = self._inflight.get(key)
+        if future is None:
+            return None
+        # shield : l'abandon d'une requête en attente n'annule pas le résultat des autres
+        shared = await asyncio.shield(future)
+        if shared is not None:
+            self.coalesced += 1
+        return shared
+
+    @contextmanager
+    def lead(self, key: str) -> Iterator[asyncio.Future]:
+        """
+        Déclare l'analyse de cette clé en cours pendant le bloc
+
+        L'appelant publie `(analyses, profondeur)` avec `set_result` ; en cas
+        d'erreur, les requêtes en attente reçoivent None et analysent elles-mêmes.
+        """
+        future = asyncio.get_running_loop().create_future()
+        # Après l'échec d'une analyse, plusieurs requêtes en attente peuvent reprendre
+        # la main : seule la première est attendue par les suivantes
+        registered = self._inflight.setdefault(key, future) is future
+        try:
+            yield future
+        finally:
+            if registered:
+                del self._inflight[key]
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self) -> dict[str, Any]:
+        """Taille et taux de réussite (pour le monitoring)"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
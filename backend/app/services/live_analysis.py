@@ -0,0 +1,252 @@
+"""Analyse en direct : recherche incrémentale diffusée au fil des profondeurs
+
+Une session suit une seule position à la fois. Chaque nouvelle position arrête
+la recherche en cours (le moteur est libéré dès que Stockfish a répondu au
+`stop`) puis en relance une nouvelle. Les mises à jour `info` sont limitées à
+une toutes les LIVE_UPDATE_INTERVAL_MS, la dernière étant toujours envoyée.
+Une recherche s'arrête à la profondeur demandée ou après LIVE_MAX_SEARCH_S, et
+se termine toujours par une trame `done` ou `error`.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+import chess
+import chess.engine
+
+from app.services.admission import AdmissionController, OverloadedError
+from app.services.analysis import handle_terminal_position
+from app.services.stockfish_manager import StockfishManager
+
+logger = logging.getLogger(__name__)
+
+LIVE_UPDATE_INTERVAL = int(os.getenv("LIVE_UPDATE_INTERVAL_MS", "100")) / 1000
+# Durée maximale d'une recherche en direct (le moteur est partagé avec les routes HTTP)
+LIVE_MAX_SEARCH_TIME = float(os.getenv("LIVE_MAX_SEARCH_S", "5"))
+
+SendFrame = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class _LiveSearch:
+    """Recherche en cours d'une session"""
+
+    id: int
+    fen: str
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    analysis: Optional[chess.engine.SimpleAnalysisResult] = None
+    started: bool = False  # Le moteur est acquis et le thread de recherche lancé
+
+
+def _info_frame(search_id: int, info: chess.engine.InfoDict) -> dict[str, Any]:
+    """Convertit un `info` Stockfish en trame (score du point de vue des blancs)"""
+    white_score = info["score"].white()
+    if white_score.is_mate():
+        score = {"type": "mate", "value": white_score.mate()}
+    else:
+        score = {"type": "cp", "value": white_score.score()}
+    return {
+        "type": "info",
+        "id": search_id,
+        "depth": info.get("depth"),
+        "score": score,
+        "pv": [move.uci() for move in info["pv"]],
+        "nodes": info.get("nodes"),
+        "nps": info.get("nps"),
+        "time_ms": round(info.get("time", 0.0) * 1000, 1),
+    }
+
+
+class LiveAnalysisSession:
+    """Session d'analyse en direct liée au moteur Stockfish partagé"""
+
+    def __init__(
+        self,
+        engine_manager: StockfishManager,
+        admission: AdmissionController,
+        client_id: str,
+        send: SendFrame,
+    ) -> None:
+        self._engine_manager = engine_manager
+        self._admission = admission
+        self._client_id = client_id
+        self._send = send
+        self._task: Optional[asyncio.Task] = None
+        self._search: Optional[_LiveSearch] = None
+        self._next_id = 1
+
+    async def set_position(self, board: chess.Board, depth: int) -> int:
+        """Abandonne la recherche en cours et lance l'analyse de `board`"""
+        await self.stop()
+
+        search = _LiveSearch(id=self._next_id, fen=board.fen())
+        self._next_id += 1
+        await self._send({"type": "started", "id": search.id, "fen": search.fen})
+
+        if board.is_game_over():
+            terminal = handle_terminal_position(board)
+            value = terminal.mate_in if terminal.evaluation_type == "mate" else terminal.evaluation
+            await self._send(
+                {
+                    "type": "done",
+                    "id": search.id,
+                    "best_move": None,
+                    "depth": 0,
+                    "score": {"type": terminal.evaluation_type, "value": value},
+                }
+            )
+            return search.id
+
+        self._search = search
+        self._task = asyncio.create_task(self._run(search, board.copy(), depth))
+        return search.id
+
+    async def stop(self) -> None:
+        """Arrête la recherche en cours et attend que le moteur soit libéré"""
+        task, search = self._task, self._search
+        self._task = self._search = None
+        if task is None or search is None or task.done():
+            return
+
+        search.stop_event.set()
+        if not search.started:
+            # Encore en attente du moteur : rien ne tourne côté Stockfish
+            task.cancel()
+        elif search.analysis is not None:
+            await asyncio.get_running_loop().run_in_executor(None, search.analysis.stop)
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _run(self, search: _LiveSearch, board: chess.Board, depth: int) -> None:
+        try:
+            await self._engine_manager.wait_ready()
+        except RuntimeError as exc:
+            # Moteur pas encore démarré (ou en échec) : le client peut renvoyer la position
+            await self._send({"type": "error", "id": search.id, "detail": str(exc)})
+            return
+
+        # Les recherches en direct passent par le même contrôle d'admission que les
+        # routes HTTP (limites, part par client, profondeur réduite sous pression)
+        try:
+            async with self._admission.admit("live-analysis", self._client_id) as ticket:
+                finished = await self._run_search(search, board, ticket.depth(depth))
+        except OverloadedError as exc:
+            await self._send(
+                {
+                    "type": "error",
+                    "id": search.id,
+                    "detail": exc.detail,
+                    "retry_after": exc.retry_after,
+                }
+            )
+            return
+
+        if not finished and not search.stop_event.is_set():
+            # Recherche terminée sans aucune variation : le client ne doit pas attendre `done`
+            await self._send(
+                {"type": "error", "id": search.id, "detail": "Stockfish returned no analysis"}
+            )
+
+    async def _run_search(self, search: _LiveSearch, board: chess.Board, depth: int) -> bool:
+        """Recherche sur le moteur partagé ; True si le client a reçu `done` ou une erreur"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Optional[chess.engine.InfoDict]] = asyncio.Queue()
+
+        completed = False
+        async with self._engine_manager.acquire() as engine:
+            search.started = True
+            # Plafond de temps : une recherche en direct ne garde pas le moteur partagé
+            # jusqu'à la profondeur demandée si celle-ci est longue à atteindre
+            limit = chess.engine.Limit(depth=depth, time=LIVE_MAX_SEARCH_TIME)
+
+            def _search() -> None:
+                try:
+                    with engine.analysis(board, limit) as analysis:
+                        search.analysis = analysis
+                        if search.stop_event.is_set():
+                            analysis.stop()
+                        for info in analysis:
+                            loop.call_soon_threadsafe(queue.put_nowait, info)
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+
+            future = loop.run_in_executor(None, _search)
+            try:
+                completed = await self._stream(search, queue)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("[LiveAnalysis] Envoi interrompu (id=%s): %s", search.id, exc)
+                search.stop_event.set()
+                if search.analysis is not None:
+                    await loop.run_in_executor(None, search.analysis.stop)
+            finally:
+                # Ne jamais rendre le moteur tant que le thread de recherche tourne
+                try:
+                    await future
+                except chess.engine.EngineError as exc:
+                    completed = True
+                    logger.error(f"[LiveAnalysis] Erreur Stockfish: {exc}")
+                    with contextlib.suppress(Exception):
+                        await self._send(
+                            {"type": "error", "id": search.id, "detail": f"Stockfish error: {exc}"}
+                        )
+        return completed
+
+    async def _stream(
+        self,
+        search: _LiveSearch,
+        queue: "asyncio.Queue[Optional[chess.engine.InfoDict]]",
+    ) -> bool:
+        """
+        Relaie les `info` vers le client en respectant le débit maximal
+
+        Retourne True si la trame `done` a été envoyée.
+        """
+        loop = asyncio.get_running_loop()
+        last_sent = 0.0
+        pending: Optional[dict[str, Any]] = None
+        last_frame: Optional[dict[str, Any]] = None
+
+        while True:
+            timeout = None
+            if pending is not None:
+                timeout = max(0.0, last_sent + LIVE_UPDATE_INTERVAL - loop.time())
+            try:
+                info = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._send(pending)
+                last_sent, pending = loop.time(), None
+                continue
+
+            if info is None:
+                break
+            if search.stop_event.is_set() or "score" not in info or not info.get("pv"):
+                continue
+
+            last_frame = _info_frame(search.id, info)
+            if loop.time() - last_sent >= LIVE_UPDATE_INTERVAL:
+                await self._send(last_frame)
+                last_sent, pending = loop.time(), None
+            else:
+                pending = last_frame
+
+        if search.stop_event.is_set():
+            return False
+        if pending is not None:
+            await self._send(pending)
+        if last_frame is None:
+            return False
+        await self._send(
+            {
+                "type": "done",
+                "id": search.id,
+                "best_move": last_frame["pv"][0],
+                "depth": last_frame["depth"],
+                "score": last_frame["score"],
+            }
+        )
+        return True
@@ -0,0 +1,81 @@
+"""Cache LRU des analyses de positions"""
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import chess
+
+from app.models import AnalyzeResponse
+from app.services.analysis import analyze_position
+from app.services.stockfish_manager import StockfishManager
+
+logger = logging.getLogger(__name__)
+
+
+def _position_key(fen: str) -> str:
+    """Clé indépendante des compteurs de coups (seuls les 4 premiers champs de la FEN)"""
+    return " ".join(fen.split()[:4])
+
+
+class PositionCache:
+    """Garde, pour chaque position, l'analyse de plus grande profondeur"""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, AnalyzeResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, fen: str, min_depth: int) -> Optional[AnalyzeResponse]:
+        """Analyse en cache d'au moins `min_depth`, sinon None"""
+        key = _position_key(fen)
+        result = self._entries.get(key)
+        if result is None or result.depth < min_depth:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, fen: str, result: AnalyzeResponse) -> None:
+        if self._max_entries <= 0:
+            return
+        key = _position_key(fen)
+        current = self._entries.get(key)
+        if current is not None and current.depth > result.depth:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+async def prewarm_position_cache(
+    cache: PositionCache,
+    engine_manager: StockfishManager,
+    fens: list[str],
+    depth: int,
+) -> int:
+    """
+    Analyse à l'avance des positions fréquentes (position initiale, ouvertures)
+
+    Chaque position prend le moteur séparément pour ne pas bloquer les
+    premières vraies requêtes. Retourne le nombre de positions mises en cache.
+    """
+    warmed = 0
+    for fen in fens:
+        try:
+            board = chess.Board() if fen == "startpos" else chess.Board(fen)
+            async with engine_manager.acquire() as engine:
+                result = await analyze_position(board, engine, depth)
+        except (ValueError, RuntimeError) as exc:
+            logger.warning(f"[PositionCache] Préchauffage ignoré pour {fen}: {exc}")
+            continue
+        cache.put(board.fen(), result)
+        warmed += 1
+    logger.info(f"[PositionCache] {warmed} positions préchauffées (depth={depth})")
+    return warmed
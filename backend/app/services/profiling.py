@@ -0,0 +1,155 @@
+"""Profilage du chemin critique
+
+Deux outils :
+- Des segments de temps (`span`) autour des étapes de l'analyse (parsing PGN,
+  FEN / copies de Board, modèles pydantic, passage à l'executor, Stockfish),
+  agrégés par requête et renvoyés dans l'en-tête `Server-Timing`. Hors requête
+  profilée, `span` ne fait qu'une lecture de ContextVar.
+- Un profileur par échantillonnage (`sample_stacks`) qui relève la pile de chaque
+  thread à intervalle régulier et produit des piles « collapsed » (flamegraph.pl,
+  speedscope).
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Active le middleware Server-Timing (les clients l'utilisent avec PROFILE_REQUEST_HEADER)
+PROFILING_SPANS = os.getenv("PROFILING_SPANS", "0") == "1"
+PROFILE_REQUEST_HEADER = b"x-profile-spans"
+SAMPLE_INTERVAL = 0.005  # secondes entre deux relevés de piles
+
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+class SpanRecorder:
+    """Durées cumulées par étape pour une requête"""
+
+    def __init__(self) -> None:
+        self.totals: dict[str, list[float]] = {}  # nom -> [durée totale (s), nombre]
+
+    def add(self, name: str, seconds: float) -> None:
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [seconds, 1]
+        else:
+            total[0] += seconds
+            total[1] += 1
+
+    def server_timing(self) -> str:
+        """Valeur de l'en-tête Server-Timing, étapes triées par durée décroissante"""
+        entries = sorted(self.totals.items(), key=lambda item: item[1][0], reverse=True)
+        return ", ".join(
+            f'{name};dur={seconds * 1000:.2f};desc="n={int(count)}"'
+            for name, (seconds, count) in entries
+        )
+
+
+_recorder: ContextVar[Optional[SpanRecorder]] = ContextVar("profiling_recorder", default=None)
+
+
+class _Span:
+    __slots__ = ("_recorder", "_name", "_start")
+
+    def __init__(self, recorder: SpanRecorder, name: str) -> None:
+        self._recorder = recorder
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self._recorder.add(self._name, time.perf_counter() - self._start)
+
+
+def span(name: str) -> contextlib.AbstractContextManager:
+    """Mesure le bloc `with` si la requête courante est profilée"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NOOP_SPAN
+    return _Span(recorder, name)
+
+
+def record(name: str, seconds: float) -> None:
+    """Ajoute une durée mesurée ailleurs (ex. dans un thread de l'executor)"""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(name, seconds)
+
+
+class ServerTimingMiddleware:
+    """
+    Profile les requêtes HTTP portant `X-Profile-Spans: 1`
+
+    Les étapes terminées avant l'envoi des en-têtes sont ajoutées dans
+    `Server-Timing`, avec la durée totale (`app`).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (PROFILE_REQUEST_HEADER, b"1") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+
+        recorder = SpanRecorder()
+        start = time.perf_counter()
+
+        async def _send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                recorder.add("app", time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", recorder.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _recorder.set(recorder)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _recorder.reset(token)
+
+
+def _frame_stack(frame: Any) -> str:
+    """Pile d'un thread, de la racine à la feuille (format collapsed)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval: float = SAMPLE_INTERVAL) -> tuple[dict[str, int], int]:
+    """
+    Relève les piles de tous les threads pendant `seconds` (bloquant)
+
+    Retourne (nombre d'occurrences par pile collapsed, nombre de relevés).
+    """
+    own_id = threading.get_ident()
+    stacks: dict[str, int] = {}
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            key = f"{names.get(thread_id, thread_id)};{_frame_stack(frame)}"
+            stacks[key] = stacks.get(key, 0) + 1
+        samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+
+def collapsed(stacks: dict[str, int]) -> str:
+    """Une ligne `pile occurrences` par pile, les plus fréquentes en premier"""
+    lines = sorted(stacks.items(), key=lambda item: item[1], reverse=True)
+    return "".join(f"{stack} {count}\n" for stack, count in lines)
@@ -0,0 +1,253 @@
+"""Extraction d'exercices (puzzles) depuis des parties analysées
+
+Pipeline :
+1. Extraction des candidats (coups "blunder"/"miss") et vérification de leur
+   cohérence avec le PGN, dans un pool de processus (CPU uniquement)
+2. Recherche moteur par tours : à chaque tour, un seul `acquire()` du moteur
+   fait avancer d'un demi-coup tous les candidats encore en lice. Les candidats
+   rejetés (solution non unique) ne coûtent plus rien dès le tour suivant, et
+   les autres requêtes peuvent accéder au moteur entre deux tours.
+3. Validation finale des lignes solution (légalité, SAN) dans le pool
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import chess
+import chess.engine
+import chess.pgn
+
+from app.models import PuzzleResponse
+from app.services.analysis import analyze_multipv
+from app.services.stockfish_manager import StockfishManager
+
+logger = logging.getLogger(__name__)
+
+PUZZLE_QUALITIES = ("blunder", "miss")
+# Écart minimal entre la 1re et la 2e variante pour qu'une solution soit unique
+PUZZLE_UNIQUENESS_MARGIN = 200  # centipawns
+PUZZLE_MAX_SOLVER_MOVES = 3
+PUZZLE_MATE_SCORE = 100000
+PUZZLE_WORKERS = int(os.getenv("PUZZLE_WORKERS", "1"))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Pool créé à la première utilisation (spawn : pas de fork d'un process multi-thread)"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PUZZLE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Arrête le pool de processus s'il a été créé"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+@dataclass
+class PuzzleCandidate:
+    """Coup raté retenu comme point de départ possible d'un exercice"""
+
+    move_number: int
+    fen: str
+    source_quality: str
+    played_move: str
+
+
+def extract_candidates(pgn: str, analyses: list[dict[str, Any]]) -> list[PuzzleCandidate]:
+    """
+    Rejoue le PGN et retient les coups "blunder"/"miss" cohérents avec la partie
+
+    Exécuté dans le pool de processus : arguments et résultat sont picklables.
+    Les analyses dont le coup joué ne correspond pas au PGN sont ignorées.
+    """
+    game = chess.pgn.read_game(io.StringIO(pgn))
+    if not game:
+        raise ValueError("PGN invalide ou vide")
+
+    wanted = {
+        a["move_number"]: a for a in analyses if a.get("move_quality") in PUZZLE_QUALITIES
+    }
+    board = game.board()
+    candidates: list[PuzzleCandidate] = []
+    for move_number, move in enumerate(game.mainline_moves(), start=1):
+        analysis = wanted.get(move_number)
+        if analysis is not None and analysis["played_move"].lower() == move.uci():
+            candidates.append(
+                PuzzleCandidate(
+                    move_number=move_number,
+                    fen=board.fen(),
+                    source_quality=analysis["move_quality"],
+                    played_move=move.uci(),
+                )
+            )
+        board.push(move)
+    return candidates
+
+
+def validate_solution(fen: str, solution: list[str]) -> Optional[list[str]]:
+    """Vérifie que la ligne est légale depuis `fen` et la retourne en SAN (None sinon)"""
+    board = chess.Board(fen)
+    san: list[str] = []
+    for uci in solution:
+        move = chess.Move.from_uci(uci)
+        if move not in board.legal_moves:
+            return None
+        san.append(board.san(move))
+        board.push(move)
+    return san
+
+
+def _pov_score(info: chess.engine.InfoDict, color: chess.Color) -> chess.engine.Score:
+    return info["score"].pov(color)
+
+
+def _is_unique(lines: list[chess.engine.InfoDict], color: chess.Color) -> bool:
+    """Le meilleur coup est-il nettement meilleur que le deuxième ?"""
+    if len(lines) < 2:
+        return True  # Coup forcé
+    first = _pov_score(lines[0], color)
+    second = _pov_score(lines[1], color)
+    if first.is_mate() and first.mate() > 0:
+        return not (second.is_mate() and second.mate() > 0)
+    first_cp = first.score(mate_score=PUZZLE_MATE_SCORE)
+    second_cp = second.score(mate_score=PUZZLE_MATE_SCORE)
+    return first_cp - second_cp >= PUZZLE_UNIQUENESS_MARGIN
+
+
+@dataclass
+class _PuzzleSearch:
+    """État d'un candidat pendant la recherche de sa ligne solution"""
+
+    candidate: PuzzleCandidate
+    board: chess.Board
+    solver: chess.Color
+    solution: list[str] = field(default_factory=list)
+    first_score: Optional[chess.engine.Score] = None
+    finished: bool = False
+    rejected: bool = False
+
+    def solver_moves(self) -> int:
+        return (len(self.solution) + 1) // 2
+
+    def finish(self) -> None:
+        # La solution se termine toujours par un coup du joueur
+        if len(self.solution) % 2 == 0 and self.solution:
+            self.solution.pop()
+        self.rejected = not self.solution
+        self.finished = True
+
+
+async def _step(search: _PuzzleSearch, engine: chess.engine.SimpleEngine, depth: int) -> None:
+    """Avance la ligne solution d'un demi-coup (une recherche moteur)"""
+    board = search.board
+    if board.turn == search.solver:
+        lines = await analyze_multipv(board, engine, depth, multipv=2)
+        if not lines or "pv" not in lines[0] or not _is_unique(lines, search.solver):
+            search.finish()
+            return
+        if search.first_score is None:
+            search.first_score = _pov_score(lines[0], search.solver)
+        move = lines[0]["pv"][0]
+    else:
+        lines = await analyze_multipv(board, engine, depth, multipv=1)
+        if not lines or "pv" not in lines[0]:
+            search.finish()
+            return
+        move = lines[0]["pv"][0]
+
+    search.solution.append(move.uci())
+    board.push(move)
+    if board.is_game_over() or (
+        board.turn != search.solver and search.solver_moves() >= PUZZLE_MAX_SOLVER_MOVES
+    ):
+        search.finish()
+
+
+async def mine_puzzles(
+    pgn: str,
+    analyses: list[dict[str, Any]],
+    engine_manager: StockfishManager,
+    depth: int,
+) -> tuple[list[PuzzleResponse], int, int]:
+    """
+    Extrait les exercices d'une partie analysée
+
+    Retourne (puzzles, nombre de candidats, nombre de recherches moteur).
+    """
+    loop = asyncio.get_event_loop()
+    pool = _get_process_pool()
+
+    candidates = await loop.run_in_executor(pool, extract_candidates, pgn, analyses)
+    searches: list[_PuzzleSearch] = []
+    for candidate in candidates:
+        board = chess.Board(candidate.fen)
+        searches.append(_PuzzleSearch(candidate=candidate, board=board, solver=board.turn))
+
+    engine_searches = 0
+    active = searches
+    while active:
+        async with engine_manager.acquire() as engine:
+            for search in active:
+                await _step(search, engine, depth)
+                engine_searches += 1
+        active = [search for search in active if not search.finished]
+
+    # Si le coup joué était la solution, l'erreur venait de la classification
+    solved = [
+        search
+        for search in searches
+        if not search.rejected and search.solution[0] != search.candidate.played_move
+    ]
+    sans = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, validate_solution, s.candidate.fen, s.solution)
+            for s in solved
+        )
+    )
+
+    puzzles: list[PuzzleResponse] = []
+    for search, san in zip(solved, sans):
+        if san is None:
+            logger.warning(
+                "[PuzzleMining] Solution illégale ignorée (coup %s): %s",
+                search.candidate.move_number,
+                search.solution,
+            )
+            continue
+        score = search.first_score
+        is_mate = score is not None and score.is_mate()
+        puzzles.append(
+            PuzzleResponse(
+                move_number=search.candidate.move_number,
+                fen=search.candidate.fen,
+                source_quality=search.candidate.source_quality,
+                played_move=search.candidate.played_move,
+                solution=search.solution,
+                solution_san=san,
+                evaluation=0.0 if is_mate or score is None else score.score() / 100.0,
+                evaluation_type="mate" if is_mate else "cp",
+                mate_in=score.mate() if is_mate else None,
+            )
+        )
+
+    logger.info(
+        "[PuzzleMining] %s puzzles / %s candidats (%s recherches moteur)",
+        len(puzzles),
+        len(candidates),
+        engine_searches,
+    )
+    return puzzles, len(candidates), engine_searches
@@ -0,0 +1,132 @@
+"""Reclassification d'analyses existantes sans relancer Stockfish
+
+Recalcule move_quality, game_phase et evaluation_loss à partir des évaluations
+déjà stockées, avec `classify_move` : les données arrivent ligne par ligne
+(JSON), la conversion en colonnes NumPy coûterait plus cher que la boucle.
+Les parties sont produites une à une pour pouvoir diffuser les résultats au
+fil de l'eau.
+"""
+import logging
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+
+from app.models import ReclassifyGame, StoredMoveEvaluation
+from app.services.game_analysis import CLASSIFICATION_VERSION, classify_move
+
+logger = logging.getLogger(__name__)
+
+
+def _to_cp(pawns: Optional[float]) -> Optional[int]:
+    return None if pawns is None else int(round(pawns * 100))
+
+
+def evaluation_before_cp(
+    analysis: StoredMoveEvaluation,
+    previous: Optional[StoredMoveEvaluation],
+) -> Optional[int]:
+    """Évaluation (centipawns) de la position avant le coup, None si inconnue"""
+    if analysis.evaluation_before is not None:
+        return _to_cp(analysis.evaluation_before)
+    if previous is not None and previous.move_number == analysis.move_number - 1:
+        # Anciennes analyses : la position avant ce coup est celle évaluée après
+        # le coup précédent
+        return _to_cp(previous.evaluation)
+    return None
+
+
+def mover_is_white(analysis: StoredMoveEvaluation) -> bool:
+    """
+    Camp qui a joué le coup
+
+    Dans l'ordre : `is_white` stocké, trait de la FEN avant le coup, parité de
+    move_number (coups impairs = blancs, faux pour une partie commencée avec les
+    noirs au trait).
+    """
+    if analysis.is_white is not None:
+        return analysis.is_white
+    if analysis.fen:
+        fields = analysis.fen.split()
+        if len(fields) > 1 and fields[1] in ("w", "b"):
+            return fields[1] == "w"
+    return analysis.move_number % 2 == 1
+
+
+def reclassify_game(game: ReclassifyGame) -> dict:
+    """Reclassifie une partie ; résultat au format `ReclassifiedGame`"""
+    analyses: list[dict] = []
+    skipped: list[int] = []
+    previous: Optional[StoredMoveEvaluation] = None
+    for analysis in game.analyses:
+        eval_before = evaluation_before_cp(analysis, previous)
+        previous = analysis
+        if eval_before is None:
+            skipped.append(analysis.move_number)
+            continue
+
+        move_quality, game_phase, evaluation_loss = classify_move(
+            eval_before,
+            _to_cp(analysis.evaluation),
+            _to_cp(analysis.evaluation_best_after),
+            mover_is_white(analysis),
+            analysis.played_move,
+            analysis.best_move,
+            analysis.move_number,
+            analysis.evaluation_type,
+            analysis.mate_in,
+            analysis.evaluation_type_best_after,
+            analysis.mate_in_best_after,
+        )
+        analyses.append(
+            {
+                "move_number": analysis.move_number,
+                "move_quality": move_quality,
+                "game_phase": game_phase,
+                "evaluation_loss": float(evaluation_loss),
+            }
+        )
+
+    return {
+        "game_id": game.game_id,
+        "classification_version": CLASSIFICATION_VERSION,
+        "analyses": analyses,
+        "skipped": skipped,
+    }
+
+
+def reclassify_games(games: Iterable[ReclassifyGame]) -> Iterator[dict]:
+    """
+    Reclassifie des parties déjà analysées, une partie par élément produit
+
+    Chaque élément a la forme de `ReclassifiedGame`. Aucun appel moteur.
+    """
+    total = 0
+    skipped = 0
+    for game in games:
+        result = reclassify_game(game)
+        skipped += len(result["skipped"])
+        total += 1
+        yield result
+
+    logger.info(
+        "[Reclassification] %s parties reclassifiées (version %s), %s coups ignorés",
+        total,
+        CLASSIFICATION_VERSION,
+        skipped,
+    )
+
+
+async def read_ndjson_games(chunks: AsyncIterable[bytes]) -> AsyncIterator[ReclassifyGame]:
+    """
+    Parties d'un corps NDJSON (une `ReclassifyGame` par ligne), lues au fil de l'eau
+
+    Seule la ligne en cours est gardée en mémoire. Lève ValueError (ValidationError
+    de pydantic) sur une ligne invalide.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield ReclassifyGame.model_validate_json(line)
+    if pending.strip():
+        yield ReclassifyGame.model_validate_json(pending)
@@ -0,0 +1,153 @@
+"""Sérialisation rapide et négociée des réponses d'analyse de partie"""
+import gzip
+import logging
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request
+from starlette.responses import Response
+
+from app.models import (
+    EVALUATION_TYPES,
+    GAME_PHASES,
+    MOVE_QUALITIES,
+    GameAnalysisResponse,
+)
+
+try:  # Brotli est optionnel : gzip est utilisé si le module n'est pas installé
+    import brotli
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPACT_MEDIA_TYPE = "application/vnd.chess-analyzer.compact+json"
+COMPACT_FORMAT_VERSION = 1
+
+# En dessous de cette taille, la compression coûte plus qu'elle ne rapporte
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_QUALITY_CODES = {name: code for code, name in enumerate(MOVE_QUALITIES)}
+_PHASE_CODES = {name: code for code, name in enumerate(GAME_PHASES)}
+_EVAL_TYPE_CODES = {name: code for code, name in enumerate(EVALUATION_TYPES)}
+
+
+def wants_compact(request: Request) -> bool:
+    """Le client demande-t-il l'encodage compact ? (query `format=compact` ou Accept)"""
+    if request.query_params.get("format") == "compact":
+        return True
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def encode_compact(analyses: list[GameAnalysisResponse]) -> dict[str, Any]:
+    """
+    Encode les analyses en colonnes
+
+    Les libellés sont remplacés par leur index dans les tables de codes (fournies
+    dans la réponse) et la FEN est omise : le client la reconstruit depuis le PGN
+    qu'il a envoyé, à partir de `move_number`.
+    """
+    return {
+        "format": "compact",
+        "version": COMPACT_FORMAT_VERSION,
+        "move_qualities": MOVE_QUALITIES,
+        "game_phases": GAME_PHASES,
+        "evaluation_types": EVALUATION_TYPES,
+        "move_number": [a.move_number for a in analyses],
+        "evaluation": [a.evaluation for a in analyses],
+        "best_move": [a.best_move for a in analyses],
+        "played_move": [a.played_move for a in analyses],
+        "move_quality": [_QUALITY_CODES[a.move_quality] for a in analyses],
+        "game_phase": [_PHASE_CODES[a.game_phase] for a in analyses],
+        "evaluation_loss": [a.evaluation_loss for a in analyses],
+        "evaluation_type": [_EVAL_TYPE_CODES[a.evaluation_type] for a in analyses],
+        "mate_in": [a.mate_in for a in analyses],
+        "evaluation_before": [a.evaluation_before for a in analyses],
+        "evaluation_best_after": [a.evaluation_best_after for a in analyses],
+        "evaluation_type_best_after": [
+            None
+            if a.evaluation_type_best_after is None
+            else _EVAL_TYPE_CODES[a.evaluation_type_best_after]
+            for a in analyses
+        ],
+        "mate_in_best_after": [a.mate_in_best_after for a in analyses],
+        "is_white": [a.is_white for a in analyses],
+    }
+
+
+def encode_standard(analyses: list[GameAnalysisResponse]) -> dict[str, Any]:
+    """Encode les analyses au format `AnalyzeGameResponse` habituel"""
+    # Les modèles sont déjà validés : leurs champs sont lus tels quels
+    return {"analyses": [a.__dict__ for a in analyses]}
+
+
+def _quality(params: str) -> float:
+    """Valeur `q` des paramètres d'un encodage (1 si absente, 0 si illisible)"""
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Choisit l'encodage de contenu supporté le plus efficace (q <= 0 : refusé)"""
+    accepted = set()
+    for token in accept_encoding.split(","):
+        coding, _, params = token.partition(";")
+        coding = coding.strip().lower()
+        if coding and _quality(params) > 0:
+            accepted.add(coding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def game_analysis_response(
+    request: Request,
+    analyses: list[GameAnalysisResponse],
+) -> Response:
+    """
+    Construit la réponse HTTP de `/analyze-game`
+
+    Contourne l'encodeur JSON standard de FastAPI (orjson sur des données déjà
+    validées), applique l'encodage compact et la compression si le client les
+    accepte.
+    """
+    if wants_compact(request):
+        content = encode_compact(analyses)
+        media_type = COMPACT_MEDIA_TYPE
+    else:
+        content = encode_standard(analyses)
+        media_type = "application/json"
+
+    body = orjson.dumps(content)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+
+    encoding = _negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding and len(body) >= COMPRESSION_MIN_SIZE:
+        raw_size = len(body)
+        body = _compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+        logger.info(
+            "[Serialization] Réponse %s compressée (%s): %s -> %s octets",
+            media_type,
+            encoding,
+            raw_size,
+            len(body),
+        )
+
+    return Response(content=body, media_type=media_type, headers=headers)
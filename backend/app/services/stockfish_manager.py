@@ -1,41 +1,94 @@
 """Gestionnaire pour le moteur Stockfish"""
 import asyncio
 import logging
-from contextlib import asynccontextmanager
-from typing import Optional
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
 
 import chess.engine
 
+from app.services.profiling import span
+
 logger = logging.getLogger(__name__)
 
+# Temps de détention du moteur cumulé par la requête courante (voir track_engine_time)
+_engine_time: ContextVar[Optional[list[float]]] = ContextVar("engine_time", default=None)
+
+
+@contextmanager
+def track_engine_time() -> Iterator[list[float]]:
+    """Cumule dans `[0]` le temps passé à détenir le moteur pendant le bloc (en s)"""
+    holder = [0.0]
+    token = _engine_time.set(holder)
+    try:
+        yield holder
+    finally:
+        _engine_time.reset(token)
+
 
 class StockfishManager:
     """Gère le cycle de vie et l'accès thread-safe au moteur Stockfish"""
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, ready_timeout: float = 15.0) -> None:
         self._path = path
         self._engine: Optional[chess.engine.SimpleEngine] = None
         self._lock = asyncio.Lock()
+        # Le démarrage peut se faire en arrière-plan : les requêtes attendent
+        # au plus `ready_timeout` secondes que le moteur soit prêt
+        self._ready = asyncio.Event()
+        self._ready_timeout = ready_timeout
+        self.start_error: Optional[str] = None
+        self.start_duration_ms: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._engine is not None
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """Attend la fin du démarrage ; RuntimeError si le moteur n'est pas disponible"""
+        if not self.is_ready and self.start_error is None:
+            try:
+                await asyncio.wait_for(
+                    self._ready.wait(),
+                    self._ready_timeout if timeout is None else timeout,
+                )
+            except asyncio.TimeoutError as exc:
+                raise RuntimeError("Stockfish engine is still starting") from exc
+        if self.start_error is not None:
+            raise RuntimeError(self.start_error)
+        if not self.is_ready:
+            raise RuntimeError("Stockfish engine not initialized")
 
     async def start(self) -> None:
         """Démarre le moteur Stockfish"""
         logger.info(f"[StockfishManager] Démarrage de Stockfish depuis: {self._path}")
         loop = asyncio.get_event_loop()
+        start_ts = time.perf_counter()
+        self.start_error = None
 
         def _launch() -> chess.engine.SimpleEngine:
             return chess.engine.SimpleEngine.popen_uci(self._path)
 
         try:
             self._engine = await loop.run_in_executor(None, _launch)
-            logger.info("[StockfishManager] Stockfish démarré avec succès")
+            self.start_duration_ms = round((time.perf_counter() - start_ts) * 1000, 2)
+            logger.info(
+                f"[StockfishManager] Stockfish démarré avec succès ({self.start_duration_ms}ms)"
+            )
         except FileNotFoundError as exc:
             logger.error(f"[StockfishManager] Stockfish non trouvé: {self._path}")
-            raise RuntimeError(
+            self.start_error = (
                 f"Stockfish binary not found at '{self._path}'. Set STOCKFISH_PATH."
-            ) from exc
+            )
+            raise RuntimeError(self.start_error) from exc
         except Exception as exc:  # noqa: BLE001
             logger.error(f"[StockfishManager] Erreur démarrage Stockfish: {exc}")
-            raise RuntimeError(f"Unable to start Stockfish: {exc}") from exc
+            self.start_error = f"Unable to start Stockfish: {exc}"
+            raise RuntimeError(self.start_error) from exc
+        finally:
+            # Réveille les requêtes en attente, que le démarrage ait réussi ou non
+            self._ready.set()
 
     async def stop(self) -> None:
         """Arrête le moteur Stockfish"""
@@ -46,6 +99,7 @@ class StockfishManager:
         async with self._lock:
             engine = self._engine
             self._engine = None
+            self._ready.clear()
 
         if engine:
             await loop.run_in_executor(None, engine.quit)
@@ -53,10 +107,18 @@ class StockfishManager:
 
     @asynccontextmanager
     async def acquire(self) -> chess.engine.SimpleEngine:
-        """Acquiert l'accès exclusif au moteur Stockfish"""
+        """Acquiert l'accès exclusif au moteur Stockfish (attend la fin du démarrage)"""
         if not self._engine:
-            raise RuntimeError("Stockfish engine not initialized")
+            await self.wait_ready()
 
-        async with self._lock:
+        with span("engine_wait"):
+            await self._lock.acquire()
+        held_since = time.perf_counter()
+        try:
             yield self._engine
+        finally:
+            self._lock.release()
+            engine_time = _engine_time.get()
+            if engine_time is not None:
+                engine_time[0] += time.perf_counter() - held_since
 
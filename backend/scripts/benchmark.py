@@ -0,0 +1,321 @@
+"""Benchmarks du backend
+
+Usage (depuis backend/) :
+    python scripts/benchmark.py serialization [--plies 120] [--repeat 200]
+    python scripts/benchmark.py classification [--plies 1000000]
+    python scripts/benchmark.py cold-start [--runs 5] [--depth 12]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import chess  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.models import (  # noqa: E402
+    EVALUATION_TYPES,
+    GAME_PHASES,
+    MOVE_QUALITIES,
+    AnalyzeGameResponse,
+    GameAnalysisResponse,
+)
+from app.services import serialization  # noqa: E402
+from app.services.batch_classification import classify_moves, load_columns  # noqa: E402
+from app.services.game_analysis import classify_move  # noqa: E402
+
+
+def _synthetic_analyses(plies: int, seed: int = 0) -> list[GameAnalysisResponse]:
+    """Génère une partie aléatoire légale et des analyses factices (sans Stockfish)"""
+    rng = random.Random(seed)
+    board = chess.Board()
+    analyses: list[GameAnalysisResponse] = []
+    for move_number in range(1, plies + 1):
+        if board.is_game_over():
+            board = chess.Board()
+        fen = board.fen()
+        move = rng.choice(list(board.legal_moves))
+        best = rng.choice(list(board.legal_moves))
+        board.push(move)
+        evaluation_type = rng.choice(EVALUATION_TYPES)
+        analyses.append(
+            GameAnalysisResponse(
+                move_number=move_number,
+                fen=fen,
+                evaluation=rng.randint(-800, 800) / 100.0,
+                best_move=best.uci(),
+                played_move=move.uci(),
+                move_quality=rng.choice(MOVE_QUALITIES),
+                game_phase=GAME_PHASES[min(move_number // 21, 2)],
+                evaluation_loss=float(rng.randint(0, 400)),
+                evaluation_type=evaluation_type,
+                mate_in=rng.randint(-5, 5) if evaluation_type == "mate" else None,
+            )
+        )
+    return analyses
+
+
+def _time_ms(func: Callable[[], bytes], repeat: int) -> tuple[float, bytes]:
+    samples = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), body
+
+
+def bench_serialization(plies: int, repeat: int) -> None:
+    analyses = _synthetic_analyses(plies)
+
+    def fastapi_default() -> bytes:
+        # Ce que fait FastAPI avec response_model : validation puis encodeur JSON standard
+        model = AnalyzeGameResponse.model_validate({"analyses": analyses})
+        return json.dumps(jsonable_encoder(model)).encode()
+
+    def orjson_standard() -> bytes:
+        import orjson
+
+        return orjson.dumps(serialization.encode_standard(analyses))
+
+    def orjson_compact() -> bytes:
+        import orjson
+
+        return orjson.dumps(serialization.encode_compact(analyses))
+
+    print(f"Sérialisation de {plies} coups (médiane sur {repeat} itérations)")
+    print(f"{'variante':<18}{'temps (ms)':>12}{'brut':>10}{'gzip':>10}{'br':>10}")
+    for name, func in (
+        ("fastapi-default", fastapi_default),
+        ("orjson", orjson_standard),
+        ("orjson-compact", orjson_compact),
+    ):
+        elapsed, body = _time_ms(func, repeat)
+        gz_size = len(gzip.compress(body, compresslevel=serialization.GZIP_LEVEL))
+        if serialization.brotli is not None:
+            br_size = str(
+                len(serialization.brotli.compress(body, quality=serialization.BROTLI_QUALITY))
+            )
+        else:
+            br_size = "-"
+        print(f"{name:<18}{elapsed:>12.3f}{len(body):>10}{gz_size:>10}{br_size:>10}")
+
+
+def _synthetic_evaluations(plies: int, seed: int = 0) -> dict[str, list]:
+    """Colonnes d'évaluations aléatoires couvrant tous les cas de classify_move"""
+    rng = random.Random(seed)
+    moves = ["e2e4", "E2E4", "d2d4", "g1f3"]
+    columns: dict[str, list] = {
+        "eval_before": [],
+        "eval_after": [],
+        "eval_best_after": [],
+        "is_white": [],
+        "played_moves": [],
+        "best_moves": [],
+        "move_numbers": [],
+        "eval_types_after": [],
+        "mates_in_after": [],
+        "eval_types_best_after": [],
+        "mates_in_best_after": [],
+    }
+    for _ in range(plies):
+        mate_after = rng.random() < 0.1
+        mate_best = rng.random() < 0.3
+        columns["eval_before"].append(rng.choice([0, rng.randint(-600, 600)]))
+        columns["eval_after"].append(rng.choice([0, rng.randint(-600, 600)]))
+        columns["eval_best_after"].append(rng.choice([None, rng.randint(-600, 600)]))
+        columns["is_white"].append(rng.random() < 0.5)
+        columns["played_moves"].append(rng.choice(moves))
+        columns["best_moves"].append(rng.choice(moves + [None, ""]))
+        columns["move_numbers"].append(rng.randint(1, 120))
+        columns["eval_types_after"].append("mate" if mate_after else "cp")
+        columns["mates_in_after"].append(
+            rng.choice([None, rng.randint(-5, 5)]) if mate_after else None
+        )
+        columns["eval_types_best_after"].append(
+            rng.choice([None, "mate" if mate_best else "cp"])
+        )
+        columns["mates_in_best_after"].append(rng.randint(-5, 5) if mate_best else None)
+    return columns
+
+
+def _as_npz_columns(columns: dict[str, list]) -> dict[str, np.ndarray]:
+    """Colonnes au format d'export .npz : NaN pour les nombres absents, "" pour les chaînes"""
+    arrays = {}
+    for name, values in columns.items():
+        if name in ("played_moves", "best_moves", "eval_types_after", "eval_types_best_after"):
+            arrays[name] = np.asarray(["" if v is None else v for v in values], dtype=str)
+        elif name == "is_white":
+            arrays[name] = np.asarray(values, dtype=bool)
+        elif name == "move_numbers":
+            arrays[name] = np.asarray(values, dtype=np.int64)
+        else:
+            arrays[name] = np.asarray(values, dtype=np.float64)
+    return arrays
+
+
+def bench_classification(plies: int) -> None:
+    columns = _synthetic_evaluations(plies)
+    names = list(columns)
+
+    start = time.perf_counter()
+    scalar = [classify_move(*row) for row in zip(*(columns[name] for name in names))]
+    scalar_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    batch = classify_moves(**columns)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    # Chemin prévu : export colonne .npz chargé avec load_columns
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "columns.npz"
+        np.savez(path, **_as_npz_columns(columns))
+        start = time.perf_counter()
+        arrays = load_columns(path)
+        load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    from_arrays = classify_moves(**arrays)
+    arrays_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = 0
+    for result in (batch, from_arrays):
+        vectorized = zip(
+            result.move_qualities(), result.game_phases(), result.evaluation_loss.tolist()
+        )
+        mismatches += sum(1 for a, b in zip(scalar, vectorized) if a != b)
+
+    print(f"Classification de {plies} coups")
+    print(f"{'classify_move (scalaire)':<28}{scalar_ms:>12.1f} ms")
+    print(f"{'classify_moves (listes)':<28}{batch_ms:>12.1f} ms  (non recommandé)")
+    print(f"{'load_columns (.npz)':<28}{load_ms:>12.1f} ms")
+    print(f"{'classify_moves (tableaux)':<28}{arrays_ms:>12.1f} ms")
+    print(f"Différences scalaire/lot : {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+def _request(url: str, payload: dict | None = None) -> tuple[int, dict]:
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"{}")
+
+
+def _wait_for(
+    func: Callable[[], bool], process: subprocess.Popen, start: float, timeout: float
+) -> float:
+    """Appelle func jusqu'à ce qu'elle réussisse ; retourne le temps écoulé depuis start (ms)"""
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {process.returncode})")
+        try:
+            if func():
+                return (time.perf_counter() - start) * 1000
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError("Le serveur n'a pas répondu à temps")
+
+
+def _cold_start_run(depth: int, timeout: float) -> dict[str, float]:
+    """Lance uvicorn et mesure health / ready / première analyse depuis le lancement"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=os.environ.copy(),
+    )
+    try:
+        health_ms = _wait_for(lambda: _request(f"{base}/health")[0] == 200, process, start, timeout)
+        # Première analyse envoyée dès que le serveur écoute : inclut l'attente du moteur
+        first_ms = _wait_for(
+            lambda: _request(
+                f"{base}/analyze-position",
+                {"fen": "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3", "depth": depth},
+            )[0]
+            == 200,
+            process,
+            start,
+            timeout,
+        )
+        status, ready = _request(f"{base}/ready")
+        if status != 200:
+            raise RuntimeError(f"/ready: {ready}")
+        return {
+            "import": ready["import_time_ms"],
+            "engine": ready["engine_start_ms"],
+            "health": health_ms,
+            "first": first_ms,
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def bench_cold_start(runs: int, depth: int, timeout: float) -> None:
+    samples = [_cold_start_run(depth, timeout) for _ in range(runs)]
+    print(f"Démarrage à froid (médiane sur {runs} lancements, depth={depth})")
+    for key, label in (
+        ("import", "imports de l'application"),
+        ("engine", "lancement de Stockfish"),
+        ("health", "lancement -> /health"),
+        ("first", "lancement -> 1re analyse"),
+    ):
+        print(f"{label:<28}{statistics.median(s[key] for s in samples):>12.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ser = subparsers.add_parser("serialization", help="Coût de sérialisation de /analyze-game")
+    ser.add_argument("--plies", type=int, default=120)
+    ser.add_argument("--repeat", type=int, default=200)
+
+    cls = subparsers.add_parser(
+        "classification", help="Classification scalaire vs vectorisée (vérifie l'égalité)"
+    )
+    cls.add_argument("--plies", type=int, default=1_000_000)
+
+    cold = subparsers.add_parser(
+        "cold-start", help="Délai entre le lancement du serveur et la première analyse"
+    )
+    cold.add_argument("--runs", type=int, default=5)
+    cold.add_argument("--depth", type=int, default=12)
+    cold.add_argument("--timeout", type=float, default=60.0)
+
+    args = parser.parse_args()
+    if args.command == "serialization":
+        bench_serialization(args.plies, args.repeat)
+    elif args.command == "classification":
+        bench_classification(args.plies)
+    elif args.command == "cold-start":
+        bench_cold_start(args.runs, args.depth, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
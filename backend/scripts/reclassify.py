@@ -0,0 +1,70 @@
+"""Reclassifie un export d'analyses sans relancer Stockfish
+
+Entrée : JSONL, une partie par ligne au format `ReclassifyGame`
+({"game_id": ..., "analyses": [...]}), typiquement un export de la table
+game_analyses regroupé par partie. Sortie : JSONL au format `ReclassifiedGame`.
+
+Pour l'historique complet, convertir une fois l'export en colonnes `.npz`
+puis reclassifier ce fichier avec le classifieur vectorisé à chaque
+changement de seuils (mêmes résultats, sans reparser le JSON).
+
+Usage (depuis backend/) :
+    python scripts/reclassify.py export.jsonl > reclassified.jsonl
+    cat export.jsonl | python scripts/reclassify.py -
+    python scripts/reclassify.py export.jsonl --save-npz history.npz
+    python scripts/reclassify.py history.npz > reclassified.jsonl
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Iterator, TextIO
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import orjson  # noqa: E402
+
+from app.models import ReclassifyGame  # noqa: E402
+from app.services.batch_classification import (  # noqa: E402
+    columns_from_games,
+    load_columns,
+    reclassify_columns,
+    save_columns,
+)
+from app.services.reclassification import reclassify_games  # noqa: E402
+
+
+def _read_games(source: TextIO) -> Iterator[ReclassifyGame]:
+    for line in source:
+        if line.strip():
+            yield ReclassifyGame.model_validate(orjson.loads(line))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "input", help="Fichier JSONL ou export colonne .npz, ou '-' pour l'entrée standard (JSONL)"
+    )
+    parser.add_argument(
+        "--save-npz",
+        metavar="PATH",
+        help="Convertit l'entrée JSONL en export colonne .npz au lieu de la reclassifier",
+    )
+    args = parser.parse_args()
+
+    out = sys.stdout.buffer
+    if args.input.endswith(".npz"):
+        for game in reclassify_columns(load_columns(args.input)):
+            out.write(orjson.dumps(game) + b"\n")
+        return
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with source:
+        if args.save_npz:
+            save_columns(args.save_npz, columns_from_games(_read_games(source)))
+            return
+        for game in reclassify_games(_read_games(source)):
+            out.write(orjson.dumps(game) + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Le classifieur vectorisé doit donner exactement les résultats de classify_move"""
+import numpy as np
+import pytest
+
+from app.models import ReclassifyGame
+from app.services.batch_classification import (
+    classify_moves,
+    columns_from_games,
+    load_columns,
+    reclassify_columns,
+    save_columns,
+)
+from app.services.game_analysis import classify_move
+from app.services.reclassification import reclassify_games
+
+# (eval_before, eval_after, eval_best_after, is_white, played, best, move_number,
+#  eval_type_after, mate_in_after, eval_type_best_after, mate_in_best_after)
+CASES = [
+    (30, 25, 35, True, "e2e4", "e2e4", 1, "cp", None, None, None),  # meilleur coup
+    (30, 25, 35, True, "e2e4", None, 1, "cp", None, None, None),  # meilleur coup inconnu
+    (30, -400, None, True, "d2d4", None, 2, "cp", None, None, None),  # sans best_after
+    (200, 180, 900, False, "e7e8q", "E7E8Q", 45, "cp", None, None, None),  # promotion, casse
+    (200, 180, 900, False, "e7e8n", "e7e8q", 45, "cp", None, None, None),  # sous-promotion
+    (0, 0, 50, True, "g1f3", "b1c3", 3, "cp", None, None, None),  # évaluations nulles
+    (500, 10000, None, True, "h5f7", "d1h5", 22, "mate", 0, None, None),  # mate_in 0
+    (500, 10000, 10000, True, "h5f7", "d1h5", 22, "mate", 3, "mate", 1),  # mat plus lent
+    (500, 10000, 10000, True, "h5f7", "d1h5", 22, "mate", 1, "mate", 3),  # mat plus rapide
+    (500, 10000, 600, True, "h5f7", "d1h5", 22, "mate", 2, "cp", None),  # mat non prévu
+    (500, -10000, 600, True, "h5f7", "d1h5", 22, "mate", -2, "cp", None),  # se fait mater
+    (-50, -60, 150, True, "a2a3", "c2c4", 41, "cp", None, None, None),  # miss
+    (12.4, -37.6, 19.5, False, "c7c5", "e7e5", 20, "cp", None, None, None),  # flottants
+    (-12.5, 88.25, None, True, "f2f4", "g1f3", 21, "cp", None, None, None),  # flottants
+    (0, 0.0001, None, False, "a7a6", "h7h6", 40, "cp", None, None, None),  # presque nul
+]
+
+
+def _columns(cases):
+    names = (
+        "eval_before",
+        "eval_after",
+        "eval_best_after",
+        "is_white",
+        "played_moves",
+        "best_moves",
+        "move_numbers",
+        "eval_types_after",
+        "mates_in_after",
+        "eval_types_best_after",
+        "mates_in_best_after",
+    )
+    return {name: [case[i] for case in cases] for i, name in enumerate(names)}
+
+
+def _as_arrays(columns):
+    """Même encodage que les exports .npz : NaN et "" pour les valeurs absentes"""
+    arrays = {}
+    for name, values in columns.items():
+        if name in ("played_moves", "best_moves", "eval_types_after", "eval_types_best_after"):
+            arrays[name] = np.array([value or "" for value in values], dtype=str)
+        else:
+            arrays[name] = np.array(
+                [np.nan if value is None else value for value in values], dtype=np.float64
+            )
+    arrays["is_white"] = arrays["is_white"].astype(bool)
+    arrays["move_numbers"] = arrays["move_numbers"].astype(np.int64)
+    return arrays
+
+
+@pytest.mark.parametrize("as_arrays", [False, True], ids=["lists", "arrays"])
+def test_batch_matches_scalar_on_edge_cases(as_arrays):
+    columns = _columns(CASES)
+    batch = classify_moves(**(_as_arrays(columns) if as_arrays else columns))
+
+    expected = [classify_move(*case) for case in CASES]
+    assert batch.move_qualities() == [quality for quality, _, _ in expected]
+    assert batch.game_phases() == [phase for _, phase, _ in expected]
+    assert batch.evaluation_loss.tolist() == pytest.approx(
+        [float(loss) for _, _, loss in expected]
+    )
+
+
+def test_empty_batch():
+    batch = classify_moves(**_as_arrays(_columns([])))
+    assert len(batch) == 0
+
+
+def _stored(move_number, evaluation, **fields):
+    return {
+        "move_number": move_number,
+        "played_move": fields.pop("played_move", "e2e4"),
+        "best_move": fields.pop("best_move", "d2d4"),
+        "evaluation": evaluation,
+        "evaluation_type": fields.pop("evaluation_type", "cp"),
+        **fields,
+    }
+
+
+GAMES = [
+    ReclassifyGame(
+        game_id="a",
+        analyses=[
+            _stored(1, 0.3, evaluation_before=0.2, evaluation_best_after=0.35),
+            _stored(2, 0.1),  # évaluation avant : celle du coup 1
+            _stored(4, -2.5, evaluation_best_after=0.0),  # trou : ignoré
+            _stored(5, 9.0, evaluation_type="mate", mate_in=0, evaluation_before=3.0),
+        ],
+    ),
+    ReclassifyGame(game_id=None, analyses=[]),
+    ReclassifyGame(
+        game_id="b",
+        analyses=[
+            _stored(1, 1.0, evaluation_before=0.5, is_white=False, best_move=None),
+            _stored(2, 1.5, evaluation_before=1.0, played_move="e7e8Q", best_move="e7e8q"),
+        ],
+    ),
+]
+
+
+def test_npz_export_round_trip_matches_row_path(tmp_path):
+    path = tmp_path / "history.npz"
+    save_columns(path, columns_from_games(GAMES))
+
+    from_columns = list(reclassify_columns(load_columns(path)))
+    from_rows = list(reclassify_games(GAMES))
+
+    assert from_columns == from_rows
+    assert from_columns[0]["skipped"] == [4]
+    assert from_columns[1] == {**from_rows[1], "game_id": None}
+
+
+def test_reclassify_columns_requires_game_columns():
+    columns = columns_from_games(GAMES)
+    del columns["game_index"]
+    with pytest.raises(ValueError):
+        list(reclassify_columns(columns))
@@ -0,0 +1,128 @@
+"""Reclassification sans moteur : évaluation avant le coup, camp, entrée NDJSON"""
+import asyncio
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import ReclassifyGame
+from app.services.game_analysis import classify_move
+from app.services.reclassification import (
+    mover_is_white,
+    read_ndjson_games,
+    reclassify_game,
+)
+
+
+def _move(move_number, evaluation, **fields):
+    return {
+        "move_number": move_number,
+        "played_move": fields.pop("played_move", "e2e4"),
+        "best_move": fields.pop("best_move", "d2d4"),
+        "evaluation": evaluation,
+        "evaluation_type": "cp",
+        **fields,
+    }
+
+
+def test_first_move_without_evaluation_before_is_skipped():
+    game = ReclassifyGame(analyses=[_move(1, 0.3), _move(2, 0.1)])
+    result = reclassify_game(game)
+    assert result["skipped"] == [1]
+    assert [a["move_number"] for a in result["analyses"]] == [2]
+
+
+def test_gap_in_move_numbers_is_skipped():
+    game = ReclassifyGame(
+        analyses=[_move(1, 0.3, evaluation_before=0.2), _move(3, -1.0), _move(4, -0.8)]
+    )
+    result = reclassify_game(game)
+    assert result["skipped"] == [3]
+    assert [a["move_number"] for a in result["analyses"]] == [1, 4]
+
+
+def test_falls_back_to_previous_move_evaluation():
+    game = ReclassifyGame(
+        analyses=[
+            _move(1, 0.5, evaluation_before=0.2),
+            _move(2, 3.5, evaluation_best_after=0.4),  # avant : 0.5 (coup 1)
+        ]
+    )
+    second = reclassify_game(game)["analyses"][1]
+    expected = classify_move(50, 350, 40, False, "e2e4", "d2d4", 2, "cp", None)
+    assert (second["move_quality"], second["game_phase"], second["evaluation_loss"]) == (
+        expected[0],
+        expected[1],
+        float(expected[2]),
+    )
+
+
+def test_explicit_evaluation_before_wins_over_previous_move():
+    game = ReclassifyGame(
+        analyses=[_move(1, 0.5, evaluation_before=0.2), _move(2, 0.4, evaluation_before=-3.0)]
+    )
+    second = reclassify_game(game)["analyses"][1]
+    expected = classify_move(-300, 40, None, False, "e2e4", "d2d4", 2, "cp", None)
+    assert second["move_quality"] == expected[0]
+    assert second["evaluation_loss"] == float(expected[2])
+
+
+@pytest.mark.parametrize(
+    "fields, expected",
+    [
+        ({"is_white": False}, False),
+        ({"fen": "8/8/8/8/8/k7/8/K7 b - - 0 1"}, False),  # partie commencée noirs au trait
+        ({"fen": "8/8/8/8/8/k7/8/K7 w - - 0 1"}, True),
+        ({"is_white": True, "fen": "8/8/8/8/8/k7/8/K7 b - - 0 1"}, True),
+        ({}, True),  # parité de move_number
+    ],
+)
+def test_mover_is_white(fields, expected):
+    game = ReclassifyGame(analyses=[_move(1, 0.0, **fields)])
+    assert mover_is_white(game.analyses[0]) is expected
+
+
+def test_ndjson_reader_handles_lines_split_across_chunks():
+    lines = b"".join(
+        orjson.dumps({"game_id": str(i), "analyses": [_move(1, 0.1, evaluation_before=0.0)]})
+        + b"\n"
+        for i in range(3)
+    )
+
+    async def _chunks():
+        for start in range(0, len(lines), 7):
+            yield lines[start : start + 7]
+
+    async def _read():
+        return [game.game_id async for game in read_ndjson_games(_chunks())]
+
+    assert asyncio.run(_read()) == ["0", "1", "2"]
+
+
+def test_reclassify_endpoint_streams_ndjson_input():
+    games = [
+        {"game_id": "a", "analyses": [_move(1, 0.3, evaluation_before=0.2)]},
+        {"game_id": "b", "analyses": [_move(1, 0.3)]},
+    ]
+    body = b"".join(orjson.dumps(game) + b"\n" for game in games) + b"{not json}\n"
+    client = TestClient(app)
+    if True:
+        response = client.post(
+            "/reclassify", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+    assert response.status_code == 200
+    rows = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [row.get("game_id") for row in rows[:2]] == ["a", "b"]
+    assert rows[1]["skipped"] == [1]
+    assert rows[2]["line"] == 3 and "error" in rows[2]
+
+
+def test_reclassify_endpoint_still_accepts_json_body():
+    client = TestClient(app)
+    if True:
+        ok = client.post("/reclassify", json={"games": [{"analyses": []}]})
+        invalid = client.post("/reclassify", json={"games": "nope"})
+    assert ok.status_code == 200
+    assert orjson.loads(ok.content.splitlines()[0])["analyses"] == []
+    assert invalid.status_code == 422
@@ -0,0 +1,44 @@
+"""Négociation de l'encodage et encodage compact de /analyze-game"""
+import pytest
+
+from app.models import CompactGameAnalysisResponse, GameAnalysisResponse
+from app.services import serialization
+from app.services.serialization import _negotiate_encoding, encode_compact
+
+
+@pytest.mark.parametrize(
+    "header",
+    ["gzip;q=0", "gzip;q=0.0", "gzip; q=0.000", "gzip;q=invalid", "identity", ""],
+)
+def test_refused_or_missing_gzip_is_not_used(header):
+    assert _negotiate_encoding(header) is None
+
+
+@pytest.mark.parametrize("header", ["gzip", "GZIP;q=0.5", "deflate, gzip;q=0.001"])
+def test_accepted_gzip(header):
+    assert _negotiate_encoding(header) == "gzip"
+
+
+def test_brotli_refused_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", object())
+    assert _negotiate_encoding("br;q=0.0, gzip") == "gzip"
+    assert _negotiate_encoding("br, gzip") == "br"
+
+
+def test_compact_encoding_matches_declared_schema():
+    analysis = GameAnalysisResponse(
+        move_number=1,
+        fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        evaluation=0.3,
+        best_move="e2e4",
+        played_move="e2e4",
+        move_quality="best",
+        game_phase="opening",
+        evaluation_loss=0.0,
+        evaluation_type="cp",
+        mate_in=None,
+        evaluation_before=0.2,
+    )
+    content = encode_compact([analysis])
+    assert set(content) == set(CompactGameAnalysisResponse.model_fields)
+    CompactGameAnalysisResponse.model_validate(content)